@@ -0,0 +1,50 @@
+"""
+Benchmarks cart.tax.compute_tax for carts of 1 to 500 lines.
+
+Usage (from the repository root):
+    python benchmarks/tax_benchmark.py
+"""
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'enigma_api_project.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from cart.tax import TaxLine, compute_tax  # noqa: E402
+
+CART_SIZES = (1, 10, 50, 100, 250, 500)
+DEPARTMENTS = {department_id: department_id % 3 != 0 for department_id in range(1, 21)}
+
+
+def make_lines(size):
+    rng = random.Random(size)
+    return [
+        TaxLine(
+            rng.randint(1, 5),
+            Decimal(rng.randint(100, 99999)) / 100,
+            rng.choice([None, *DEPARTMENTS])
+        )
+        for _ in range(size)
+    ]
+
+
+def main():
+    print(f"{'lines':>6} {'per call (us)':>14} {'per line (us)':>14}")
+    for size in CART_SIZES:
+        lines = make_lines(size)
+        number = max(1, 20000 // size)
+        seconds = min(timeit.repeat(lambda: compute_tax(lines, DEPARTMENTS), number=number, repeat=5))
+        per_call = seconds / number * 1e6
+        print(f'{size:>6} {per_call:>14.1f} {per_call / size:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -52,7 +52,7 @@ class ProductAdmin(admin.ModelAdmin):
 # /////////////////////////////////////////////////////////////////////////////////////////////
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
-    list_display = ['user', 'created_at', 'updated_at']
+    list_display = ['user', 'item_count', 'total', 'created_at', 'updated_at']
     search_fields = ['user__username']
     list_filter = ['created_at']
     list_per_page = 10
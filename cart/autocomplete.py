@@ -0,0 +1,212 @@
+# autocomplete.py
+
+import logging
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_GENERATION_KEY = 'autocomplete:generation'
+
+# Rough per-key cost on top of the key string: the (key, id) tuple, its list
+# slot and the id.
+ENTRY_OVERHEAD = 100
+
+# =============================================================================
+# Name Normalization
+# =============================================================================
+
+def normalize(text):
+    """
+    Case-folds, strips accents and collapses whitespace.
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+def name_keys(name):
+    """
+    Returns the keys a name is found under: the name itself and the tail
+    starting at each later word, so 'iPhone Case' matches 'case' too.
+    """
+    words = normalize(name).split(' ')
+    return tuple(' '.join(words[start:]) for start in range(len(words)) if words[start])
+
+# =============================================================================
+# Prefix Index
+# =============================================================================
+
+class PrefixIndex:
+    """
+    A sorted array of (normalized key, product id) searched with bisect.
+    Keys that would take the index over ``memory_budget`` bytes (estimated)
+    are not added, and ``complete`` is cleared so the shortfall is visible.
+    """
+
+    def __init__(self, memory_budget):
+        self.memory_budget = memory_budget
+        self.complete = True
+        self.memory_usage = 0
+        self._keys = []
+        self._products = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._products)
+
+    @staticmethod
+    def _cost(keys):
+        return sum(sys.getsizeof(key) + ENTRY_OVERHEAD for key in keys)
+
+    def load(self, rows):
+        """
+        Replaces the contents with ``rows`` of (id, name, price), sorting once.
+        """
+        keys = []
+        products = {}
+        usage = 0
+        complete = True
+        for product_id, name, price in rows:
+            product_keys = name_keys(name)
+            cost = self._cost(product_keys)
+            if usage + cost > self.memory_budget:
+                complete = False
+                continue
+            usage += cost
+            products[product_id] = (name, price, product_keys)
+            keys.extend((key, product_id) for key in product_keys)
+        keys.sort()
+        with self._lock:
+            self._keys, self._products = keys, products
+            self.memory_usage, self.complete = usage, complete
+        if not complete:
+            logger.warning('Autocomplete index is over its memory budget; some products were left out.')
+
+    def add(self, product_id, name, price):
+        with self._lock:
+            self._discard(product_id)
+            product_keys = name_keys(name)
+            cost = self._cost(product_keys)
+            if self.memory_usage + cost > self.memory_budget:
+                self.complete = False
+                return
+            for key in product_keys:
+                insort(self._keys, (key, product_id))
+            self._products[product_id] = (name, price, product_keys)
+            self.memory_usage += cost
+
+    def discard(self, product_id):
+        with self._lock:
+            self._discard(product_id)
+
+    def _discard(self, product_id):
+        entry = self._products.pop(product_id, None)
+        if entry is None:
+            return
+        for key in entry[2]:
+            position = bisect_left(self._keys, (key, product_id))
+            if position < len(self._keys) and self._keys[position] == (key, product_id):
+                del self._keys[position]
+        self.memory_usage -= self._cost(entry[2])
+
+    def search(self, prefix, limit):
+        """
+        Returns up to ``limit`` (id, name, price) whose name or one of its
+        words starts with ``prefix``, in key order.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        with self._lock:
+            position = bisect_left(self._keys, (prefix,))
+            while position < len(self._keys) and len(results) < limit:
+                key, product_id = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                if product_id not in seen:
+                    seen.add(product_id)
+                    name, price, _ = self._products[product_id]
+                    results.append((product_id, name, price))
+                position += 1
+        return results
+
+# =============================================================================
+# Process-wide Index
+# =============================================================================
+
+_index = None
+_built = (None, 0.0)  # (generation, monotonic build time)
+_build_lock = threading.Lock()
+
+
+def _generation():
+    return cache.get(AUTOCOMPLETE_GENERATION_KEY, 0)
+
+
+def build_index():
+    """
+    Builds this process's index from scratch in one query and returns it.
+    """
+    global _index, _built
+    with _build_lock:
+        generation = _generation()
+        index = PrefixIndex(getattr(settings, 'AUTOCOMPLETE_MEMORY_BUDGET', 32 * 1024 * 1024))
+        index.load(Product.objects.order_by('pk').values_list('id', 'name', 'price').iterator())
+        _index, _built = index, (generation, time.monotonic())
+        return index
+
+
+def get_index():
+    """
+    Returns this process's index, building it on first use. It is rebuilt
+    when ``rebuild_autocomplete`` bumped the shared generation or after
+    AUTOCOMPLETE_MAX_AGE seconds, which bounds how long changes made by
+    other processes go unseen.
+    """
+    generation, built_at = _built
+    max_age = getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 600)
+    if _index is None or generation != _generation() or time.monotonic() - built_at > max_age:
+        return build_index()
+    return _index
+
+
+def request_rebuild():
+    """
+    Makes every process rebuild its index on its next lookup.
+    """
+    cache.set(AUTOCOMPLETE_GENERATION_KEY, time.time_ns(), None)
+
+
+def reset_index():
+    global _index, _built
+    with _build_lock:
+        _index, _built = None, (None, 0.0)
+
+
+def autocomplete(prefix, limit=10):
+    return get_index().search(prefix, limit)
+
+
+def product_changed(product):
+    """
+    Applies a saved product to this process's index, if it is built.
+    """
+    if _index is not None:
+        _index.add(product.pk, product.name, Decimal(product.price))
+
+
+def product_deleted(product_id):
+    if _index is not None:
+        _index.discard(product_id)
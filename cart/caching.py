@@ -0,0 +1,138 @@
+# caching.py
+
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import CartItem
+
+# =============================================================================
+# Serialized Cart Cache
+# =============================================================================
+
+CART_VERSION_KEY = 'cart:payload-version:{cart_id}'
+CART_PAYLOAD_KEY = 'cart:payload:{cart_id}:{version}:{host}'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, 'CART_CACHE_ALIAS', 'default')]
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cache_stats():
+    """
+    Returns this process's {'hits': n, 'misses': n} for the cart cache.
+    """
+    with _stats_lock:
+        return {'hits': _stats['hits'], 'misses': _stats['misses']}
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _cart_version(cart_id):
+    """
+    Returns the cart's current payload version. A missing version starts at
+    the current time, so payloads cached under an evicted version can never
+    be served again.
+    """
+    cache = _cache()
+    key = CART_VERSION_KEY.format(cart_id=cart_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_cart_payload(cart_id, host, build_payload):
+    """
+    Returns the serialized cart from the cache, calling ``build_payload()``
+    and caching the result on a miss. Returns (payload, hit).
+    """
+    cache = _cache()
+    key = CART_PAYLOAD_KEY.format(cart_id=cart_id, version=_cart_version(cart_id), host=host)
+    payload = cache.get(key)
+    if payload is not None:
+        _count('hits')
+        return payload, True
+    _count('misses')
+    payload = build_payload()
+    cache.set(key, payload, getattr(settings, 'CART_CACHE_TIMEOUT', 300))
+    return payload, False
+
+
+def invalidate_carts(cart_ids):
+    """
+    Bumps the payload version of each cart; the old payloads expire on their own.
+    """
+    cache = _cache()
+    for cart_id in set(cart_ids):
+        try:
+            cache.incr(CART_VERSION_KEY.format(cart_id=cart_id))
+        except ValueError:
+            # Nothing cached for this cart.
+            pass
+
+
+def invalidate_carts_containing(product=None, device=None, product_ids=None):
+    """
+    Invalidates the carts with a line for the product, the device, or any of
+    ``product_ids``.
+    """
+    if product_ids is not None:
+        lines = CartItem.objects.filter(product_id__in=product_ids)
+    elif product is not None:
+        lines = CartItem.objects.filter(product=product)
+    else:
+        lines = CartItem.objects.filter(device=device)
+    invalidate_carts(lines.values_list('cart_id', flat=True).distinct())
+
+# =============================================================================
+# Versioned Response Cache
+# =============================================================================
+
+MODEL_VERSION_KEY = 'response:model-version:{label}'
+
+
+def response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def model_version(model):
+    """
+    Returns the model's current response version; like cart versions, a
+    missing version restarts at the current time.
+    """
+    cache = response_cache()
+    key = MODEL_VERSION_KEY.format(label=model._meta.label_lower)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_model_version(model):
+    """
+    Invalidates every cached response of the model.
+    """
+    cache = response_cache()
+    key = MODEL_VERSION_KEY.format(label=model._meta.label_lower)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # No version yet, so nothing is cached under one.
+        pass
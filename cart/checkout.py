@@ -0,0 +1,76 @@
+# checkout.py
+
+from collections import Counter
+
+from django.db import transaction
+
+from . import summaries
+from .inventory import decrement_on_hand
+from .models import Cart, Order, OrderItem
+from .tax import TaxLine, compute_tax
+
+# =============================================================================
+# Checkout
+# =============================================================================
+
+class EmptyCart(Exception):
+    """
+    Raised when checking out a cart with no lines.
+    """
+
+
+def checkout_cart(cart_id):
+    """
+    Converts the cart into an Order in one transaction:
+
+    - locks the cart row,
+    - snapshots each line's effective price into OrderItem rows (one bulk_create),
+    - decrements Product.on_hand with one guarded UPDATE,
+    - computes the order subtotal, tax and total server-side and stores them,
+    - clears the cart.
+
+    The number of queries does not depend on the number of lines.
+    Raises EmptyCart or ``inventory.InsufficientStock``; either way nothing
+    is written.
+    """
+    with transaction.atomic():
+        cart = Cart.objects.select_for_update().get(pk=cart_id)
+        lines = list(cart.items.select_related('product', 'device'))
+        if not lines:
+            raise EmptyCart()
+
+        result = compute_tax([
+            TaxLine(
+                line.quantity,
+                line.effective_price,
+                (line.product or line.device).department_id
+            )
+            for line in lines
+        ])
+        order = Order.objects.create(
+            user_id=cart.user_id,
+            subtotal=result.subtotal,
+            tax=result.tax,
+            total=result.total
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=line.product,
+                device=line.device,
+                quantity=line.quantity,
+                price=line.effective_price
+            )
+            for line in lines
+        ])
+
+        stock = Counter()
+        for line in lines:
+            if line.product_id:
+                stock[line.product_id] += line.quantity
+        decrement_on_hand(stock)
+
+        with summaries.deferred():
+            cart.items.all().delete()
+        summaries.reset(cart.pk)
+    return order
@@ -0,0 +1,81 @@
+# exports.py
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from rest_framework.renderers import BaseRenderer
+
+# =============================================================================
+# Catalog Export
+# =============================================================================
+
+PRODUCT_EXPORT_FIELDS = (
+    'id', 'name', 'price', 'cost', 'description', 'image', 'barcode',
+    'location_name', 'department_name', 'is_available', 'on_hand',
+    'created_at', 'updated_at',
+)
+
+
+def product_export_rows(queryset, chunk_size):
+    """
+    Yields one dict per product, reading ``chunk_size`` rows at a time.
+    Location and department names come from the same query through joins.
+    """
+    return queryset.values(
+        'id', 'name', 'price', 'cost', 'description', 'image', 'barcode',
+        'is_available', 'on_hand', 'created_at', 'updated_at',
+        location_name=F('location__name'),
+        department_name=F('department__name'),
+    ).order_by('pk').iterator(chunk_size=chunk_size)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+class _Line:
+    """
+    A write-only file object that hands back what csv.writer writes.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, fields):
+    writer = csv.DictWriter(_Line(), fieldnames=fields, extrasaction='ignore')
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+# =============================================================================
+# Export Renderers
+# =============================================================================
+# The export action streams its own body; these renderers let DRF negotiate
+# ``?format=ndjson|csv`` (or the Accept header) and render error responses.
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return ''.join(ndjson_lines(data if isinstance(data, list) else [data])).encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows else []
+        return ''.join(csv_lines(rows, fields)).encode(self.charset)
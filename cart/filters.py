@@ -0,0 +1,46 @@
+# filters.py
+
+import django_filters
+
+from .models import Device, Order, Product
+
+# =============================================================================
+# Catalog FilterSets
+# =============================================================================
+# Every filter below is served by an index declared on its model (foreign keys
+# are indexed by Django), so none of them falls back to a full table scan.
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    Filters products by department, location, availability and price range.
+    """
+    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+
+    class Meta:
+        model = Product
+        fields = ['department', 'location', 'is_available', 'min_price', 'max_price']
+
+
+class DeviceFilter(django_filters.FilterSet):
+    """
+    Filters the user's devices by department, location and creation date.
+    """
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+
+    class Meta:
+        model = Device
+        fields = ['department', 'location', 'created_after', 'created_before']
+
+
+class OrderFilter(django_filters.FilterSet):
+    """
+    Filters the user's orders by status and creation date.
+    """
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+
+    class Meta:
+        model = Order
+        fields = ['status', 'created_after', 'created_before']
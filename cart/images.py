@@ -0,0 +1,184 @@
+# images.py
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# Image Derivatives
+# =============================================================================
+# Every product and device image gets smaller copies stored next to it as
+# ``<name>.<size>.<ext>`` (e.g. products/mug.jpg.thumbnail.webp), so list views
+# can link to a few kilobytes instead of the original photo. The names are
+# derived from the original, so nothing extra is stored in the database.
+
+DEFAULT_SIZES = {'thumbnail': 128, 'medium': 640}
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+
+def derivative_sizes():
+    """
+    Returns {size name: longest side in pixels}.
+    """
+    return getattr(settings, 'IMAGE_DERIVATIVE_SIZES', DEFAULT_SIZES)
+
+
+def derivative_format():
+    """
+    Returns the Pillow format derivatives are encoded in: the configured
+    one, with JPEG standing in for WebP when Pillow was built without it.
+    """
+    preferred = getattr(settings, 'IMAGE_DERIVATIVE_FORMAT', 'WEBP').upper()
+    if preferred == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return preferred
+
+
+def derivative_name(name, size):
+    """
+    Returns the storage name of the ``size`` derivative of image ``name``.
+    The original's extension is kept, so mug.jpg and mug.png do not share
+    derivatives.
+    """
+    return f'{name}.{size}.{EXTENSIONS[derivative_format()]}'
+
+
+def derivative_urls(name, storage=None):
+    """
+    Returns {size name: URL} for image ``name``. The URLs are computed, not
+    checked, so they may 404 for a moment after an upload.
+    """
+    storage = storage or default_storage
+    return {size: storage.url(derivative_name(name, size)) for size in derivative_sizes()}
+
+
+def generate_derivatives(name, overwrite=False, storage=None):
+    """
+    Writes the missing derivatives of image ``name`` (all of them with
+    ``overwrite``) and returns the names written. The original is decoded
+    once, at reduced scale when the format allows it, and each size is
+    resized from the next larger one.
+    """
+    storage = storage or default_storage
+    image_format = derivative_format()
+    sizes = sorted(derivative_sizes().items(), key=lambda item: item[1], reverse=True)
+    targets = [
+        (derivative_name(name, size), pixels) for size, pixels in sizes
+        if overwrite or not storage.exists(derivative_name(name, size))
+    ]
+    if not targets:
+        return []
+
+    largest = targets[0][1]
+    with storage.open(name, 'rb') as original:
+        image = Image.open(original)
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    mode = 'RGBA' if has_alpha and image_format != 'JPEG' else 'RGB'
+    if image.mode != mode:
+        image = image.convert(mode)
+
+    quality = getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80)
+    written = []
+    for target, pixels in targets:
+        image.thumbnail((pixels, pixels), Image.LANCZOS)
+        buffer = BytesIO()
+        image.save(buffer, image_format, quality=quality, optimize=True)
+        storage.delete(target)
+        written.append(storage.save(target, ContentFile(buffer.getvalue())))
+    return written
+
+
+def delete_derivatives(name, storage=None):
+    """
+    Deletes the derivatives of image ``name``, e.g. after it was replaced.
+    """
+    storage = storage or default_storage
+    for size in derivative_sizes():
+        storage.delete(derivative_name(name, size))
+
+
+def _generate_logged(name, overwrite=False):
+    """
+    Runs ``generate_derivatives`` for a pool worker, logging instead of
+    raising. Returns False if the image could not be processed.
+    """
+    try:
+        generate_derivatives(name, overwrite)
+    except Exception:
+        logger.exception('Could not generate derivatives of %s', name)
+        return False
+    return True
+
+# =============================================================================
+# Background Generation
+# =============================================================================
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the process-wide pool that generates derivatives after uploads.
+    Pillow releases the GIL while decoding, resizing and encoding, so
+    threads keep request workers free without the cost of processes.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2),
+                thread_name_prefix='image-derivatives'
+            )
+    return _executor
+
+
+def schedule_derivatives(name, replaced=None):
+    """
+    Once the current transaction commits, deletes the derivatives of the
+    ``replaced`` image and generates those of image ``name`` (if any): in
+    the pool, or inline when IMAGE_DERIVATIVES_ASYNC is off.
+    """
+    def run():
+        if replaced:
+            try:
+                delete_derivatives(replaced)
+            except Exception:
+                logger.exception('Could not delete derivatives of %s', replaced)
+        if name:
+            _generate_logged(name, True)
+
+    def submit():
+        if getattr(settings, 'IMAGE_DERIVATIVES_ASYNC', True):
+            get_executor().submit(run)
+        else:
+            run()
+
+    transaction.on_commit(submit)
+
+
+def backfill_derivatives(names, overwrite=False, workers=None):
+    """
+    Generates the derivatives of every image in ``names`` in a pool of
+    ``workers`` threads. Returns (processed, failed) counts.
+    """
+    workers = workers or getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2)
+    processed = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for ok in pool.map(lambda name: _generate_logged(name, overwrite), names):
+            processed += 1
+            failed += not ok
+    return processed, failed
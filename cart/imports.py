@@ -0,0 +1,177 @@
+# imports.py
+
+import csv
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import autocomplete, scanning, summaries
+from .models import CartItem, Department, Location, Product
+from .search import get_search_backend
+from .serializers import ProductImportRowSerializer
+
+# =============================================================================
+# Import Files
+# =============================================================================
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+def read_rows(lines, file_format):
+    """
+    Yields (row_number, data, error) for each record of a CSV or NDJSON
+    stream of text lines; exactly one of ``data`` and ``error`` is set.
+    Empty CSV cells are treated as absent.
+    """
+    if file_format == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            yield number, {
+                key.strip(): value.strip() for key, value in row.items()
+                if key and value not in (None, '')
+            }, None
+        return
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield number, None, {'non_field_errors': [f'Invalid JSON: {exc}']}
+            continue
+        if not isinstance(data, dict):
+            yield number, None, {'non_field_errors': ['Each line must be a JSON object.']}
+            continue
+        yield number, data, None
+
+# =============================================================================
+# Product Import
+# =============================================================================
+
+# Fields a new product needs, mapped to the column names used in reports.
+REQUIRED_FOR_CREATE = {'name': 'name', 'price': 'price', 'location_id': 'location', 'department_id': 'department'}
+
+
+class ImportReport:
+    """
+    Counts of created and updated products and the errors of skipped rows.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def add_error(self, row, errors):
+        self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {'created': self.created, 'updated': self.updated, 'errors': self.errors}
+
+
+def _name_map(model):
+    """
+    Returns {name: id}; the lowest id wins when names repeat.
+    """
+    return dict(model.objects.order_by('-pk').values_list('name', 'pk'))
+
+
+def import_products(rows, batch_size=None):
+    """
+    Upserts products by barcode from (row_number, data, error) rows, as
+    produced by ``read_rows``. Each batch of ``batch_size`` valid rows costs
+    one IN query to find existing products, one bulk_create and one
+    bulk_update, in its own transaction. Invalid rows are skipped and
+    reported. Returns an ImportReport.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'IMPORT_BATCH_SIZE', 500)
+    names = {'location': _name_map(Location), 'department': _name_map(Department)}
+    report = ImportReport()
+    seen = set()
+    batch = []
+    for number, data, error in rows:
+        if error:
+            report.add_error(number, error)
+            continue
+        serializer = ProductImportRowSerializer(data=data)
+        if not serializer.is_valid():
+            report.add_error(number, serializer.errors)
+            continue
+        values = dict(serializer.validated_data)
+        barcode = values.pop('barcode')
+        if barcode in seen:
+            report.add_error(number, {'barcode': ['Duplicate barcode in this import.']})
+            continue
+        seen.add(barcode)
+
+        errors = {}
+        for field in ('location', 'department'):
+            if field in values:
+                pk = names[field].get(values.pop(field))
+                if pk is None:
+                    errors[field] = [f'Unknown {field}.']
+                else:
+                    values[f'{field}_id'] = pk
+        if errors:
+            report.add_error(number, errors)
+            continue
+
+        batch.append((number, barcode, values))
+        if len(batch) >= batch_size:
+            _apply_batch(batch, report)
+            batch = []
+    if batch:
+        _apply_batch(batch, report)
+    return report
+
+
+def _apply_batch(batch, report):
+    with transaction.atomic():
+        existing = Product.objects.in_bulk([barcode for _, barcode, _ in batch], field_name='barcode')
+        now = timezone.now()
+        created = []
+        updated = []
+        fields = set()
+        for number, barcode, values in batch:
+            product = existing.get(barcode)
+            if product is None:
+                missing = [name for field, name in REQUIRED_FOR_CREATE.items() if field not in values]
+                if missing:
+                    report.add_error(number, {name: ['This field is required to create a product.'] for name in missing})
+                    continue
+                created.append(Product(barcode=barcode, **values))
+            else:
+                for field, value in values.items():
+                    setattr(product, field, value)
+                product.updated_at = now
+                fields.update(values)
+                updated.append(product)
+
+        created = Product.objects.bulk_create(created)
+        if created and created[0].pk is None:
+            created = list(Product.objects.filter(barcode__in=[product.barcode for product in created]))
+        if updated:
+            Product.objects.bulk_update(updated, [*fields, 'updated_at'])
+        _sync_derived_state(created, updated)
+    report.created += len(created)
+    report.updated += len(updated)
+
+
+def _sync_derived_state(created, updated):
+    """
+    Does what the Product signal handlers would have done; bulk writes do
+    not send post_save.
+    """
+    products = created + updated
+    get_search_backend().index(products)
+    for product in products:
+        autocomplete.product_changed(product)
+    scanning.forget_barcodes(*(product.barcode for product in products))
+    if updated:
+        summaries.recalculate_summaries(
+            CartItem.objects.filter(product__in=updated).values_list('cart_id', flat=True).distinct()
+        )
@@ -0,0 +1,93 @@
+# inventory.py
+
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from . import caching
+from .models import Product
+
+# =============================================================================
+# Inventory Adjustments
+# =============================================================================
+
+class InsufficientStock(Exception):
+    """
+    Raised when a decrement would take a product's on_hand below zero.
+    """
+
+    def __init__(self, product_ids):
+        super().__init__(f'Insufficient stock for products {sorted(product_ids)}.')
+        self.product_ids = sorted(product_ids)
+
+
+class UnknownProducts(Exception):
+    """
+    Raised when an adjustment names products that do not exist.
+    """
+
+    def __init__(self, product_ids):
+        super().__init__(f'Unknown products {sorted(product_ids)}.')
+        self.product_ids = sorted(product_ids)
+
+
+class _Shortfall(Exception):
+    pass
+
+
+def adjust_on_hand(deltas, allow_negative=True):
+    """
+    Applies {product_id: delta} with a single UPDATE
+    (``on_hand = on_hand + delta``), so concurrent adjustments never overwrite
+    each other, and returns {product_id: new on_hand} read back in one query.
+
+    With ``allow_negative=False`` each decrement only applies where
+    ``on_hand >= -delta`` and InsufficientStock is raised if any could not be
+    applied. UnknownProducts is raised for ids that do not exist. Either way
+    nothing is written.
+
+    The UPDATE sends no signals, so the cached payloads of carts holding the
+    adjusted products are invalidated here.
+    """
+    changes = {pk: delta for pk, delta in deltas.items() if delta}
+    try:
+        with transaction.atomic():
+            if changes:
+                guard = Q()
+                whens = []
+                for pk, delta in changes.items():
+                    if allow_negative or delta > 0:
+                        guard |= Q(pk=pk)
+                    else:
+                        guard |= Q(pk=pk, on_hand__gte=-delta)
+                    whens.append(When(pk=pk, then=F('on_hand') + delta))
+                updated = Product.objects.filter(guard).update(
+                    on_hand=Case(*whens, default=F('on_hand')),
+                    updated_at=timezone.now()
+                )
+            on_hand = dict(Product.objects.filter(pk__in=deltas).values_list('pk', 'on_hand'))
+            missing = set(deltas) - set(on_hand)
+            if missing:
+                raise UnknownProducts(missing)
+            if changes and updated != len(changes):
+                raise _Shortfall()
+    except _Shortfall:
+        # Rolled back, so these are the quantities before the adjustment.
+        on_hand = dict(Product.objects.filter(pk__in=changes).values_list('pk', 'on_hand'))
+        raise InsufficientStock([pk for pk, delta in changes.items() if delta < 0 and on_hand[pk] < -delta])
+    if changes:
+        caching.invalidate_carts_containing(product_ids=list(changes))
+    return on_hand
+
+
+def decrement_on_hand(quantities):
+    """
+    Decrements ``on_hand`` for {product_id: quantity} in a single guarded
+    UPDATE: ``on_hand = on_hand - quantity`` only where ``on_hand >= quantity``.
+    Raises InsufficientStock (the caller's transaction should roll back) if
+    any product could not be decremented. Cached carts are invalidated by
+    ``adjust_on_hand``.
+    """
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity}
+    if quantities:
+        adjust_on_hand({pk: -quantity for pk, quantity in quantities.items()}, allow_negative=False)
@@ -0,0 +1,27 @@
+# generate_image_derivatives.py
+
+from itertools import chain
+
+from django.core.management.base import BaseCommand
+
+from cart.images import backfill_derivatives
+from cart.models import Device, Product
+
+
+class Command(BaseCommand):
+    """
+    Generates thumbnails and medium sizes for existing product and device images.
+    """
+    help = 'Generates the missing derivatives of every product and device image.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--overwrite', action='store_true', help='Regenerate existing derivatives.')
+        parser.add_argument('--workers', type=int, default=None)
+
+    def handle(self, *args, **options):
+        names = sorted(set(chain.from_iterable(
+            model.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True)
+            for model in (Product, Device)
+        )))
+        processed, failed = backfill_derivatives(names, options['overwrite'], options['workers'])
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} images ({failed} failed).'))
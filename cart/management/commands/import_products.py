@@ -0,0 +1,31 @@
+# import_products.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cart.imports import IMPORT_FORMATS, import_products, read_rows
+
+
+class Command(BaseCommand):
+    """
+    Upserts products by barcode from a CSV or NDJSON file.
+    """
+    help = 'Imports a CSV or NDJSON product file, matching existing products by barcode.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', dest='file_format', choices=IMPORT_FORMATS)
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or path.rsplit('.', 1)[-1].lower()
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError(f"Cannot tell the format of {path}; pass --format.")
+        with open(path, encoding='utf-8-sig', newline='') as lines:
+            report = import_products(read_rows(lines, file_format), options['batch_size'])
+
+        for error in report.errors:
+            self.stdout.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {report.created}, updated {report.updated}, skipped {len(report.errors)} rows.'
+        ))
@@ -0,0 +1,16 @@
+# prune_sync_tombstones.py
+
+from django.core.management.base import BaseCommand
+
+from cart.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    """
+    Deletes catalog tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS.
+    """
+    help = 'Prunes the catalog deletion log used by the delta-sync endpoint.'
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstones.'))
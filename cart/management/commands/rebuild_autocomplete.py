@@ -0,0 +1,24 @@
+# rebuild_autocomplete.py
+
+from django.core.management.base import BaseCommand
+
+from cart.autocomplete import build_index, request_rebuild
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the product-name autocomplete index from scratch.
+    """
+    help = 'Makes every process rebuild its autocomplete index and reports its size.'
+
+    def handle(self, *args, **options):
+        request_rebuild()
+        index = build_index()
+        self.stdout.write(
+            f'Indexed {len(index)} products in about {index.memory_usage // 1024} KiB '
+            f'of a {index.memory_budget // 1024} KiB budget.'
+        )
+        if not index.complete:
+            self.stdout.write(self.style.WARNING('The memory budget was exceeded; some products were left out.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Autocomplete index rebuilt.'))
@@ -0,0 +1,41 @@
+# rebuild_cart_summaries.py
+
+from django.core.management.base import BaseCommand
+
+from cart.models import Cart
+from cart.summaries import find_stale_summaries, recalculate_summaries
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds (or, with --verify, only checks) the stored cart summaries.
+    """
+    help = 'Rebuilds the stored item_count/subtotal/tax/total of every cart in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report carts whose stored summary is stale; do not write.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        cart_ids = list(Cart.objects.order_by('pk').values_list('pk', flat=True))
+        processed = 0
+        stale = []
+        for start in range(0, len(cart_ids), batch_size):
+            batch = cart_ids[start:start + batch_size]
+            if options['verify']:
+                stale.extend(find_stale_summaries(batch))
+            else:
+                recalculate_summaries(batch)
+            processed += len(batch)
+
+        if options['verify']:
+            for cart_id in stale:
+                self.stdout.write(f'Cart {cart_id} has a stale summary.')
+            self.stdout.write(f'Verified {processed} carts, {len(stale)} stale.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {processed} cart summaries.'))
@@ -0,0 +1,19 @@
+# rebuild_product_search.py
+
+from django.core.management.base import BaseCommand
+
+from cart.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the product full-text search index.
+    """
+    help = 'Re-indexes every product for full-text search in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        indexed = rebuild_search_index(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} products.'))
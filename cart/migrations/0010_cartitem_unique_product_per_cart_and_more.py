@@ -0,0 +1,47 @@
+# Generated by Django 4.2.14 on 2026-10-16 20:58
+
+from django.db import migrations, models
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    """
+    Folds repeated (cart, product) and (cart, device) lines into the oldest
+    line so the partial unique constraints can be created.
+    """
+    CartItem = apps.get_model('cart', 'CartItem')
+    kept = {}
+    duplicates = []
+    for item in CartItem.objects.order_by('created_at', 'id'):
+        if item.product_id is not None:
+            key = ('product', item.cart_id, item.product_id)
+        elif item.device_id is not None:
+            key = ('device', item.cart_id, item.device_id)
+        else:
+            continue
+        if key in kept:
+            kept[key].quantity += item.quantity
+            duplicates.append(item.pk)
+        else:
+            kept[key] = item
+    if duplicates:
+        CartItem.objects.bulk_update(kept.values(), ['quantity'])
+        CartItem.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0009_alter_device_owner'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('product__isnull', False)), fields=('cart', 'product'), name='unique_product_per_cart'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('device__isnull', False)), fields=('cart', 'device'), name='unique_device_per_cart'),
+        ),
+    ]
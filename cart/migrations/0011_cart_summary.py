@@ -0,0 +1,71 @@
+# Generated by Django 4.2.14 on 2026-10-16 21:00
+
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_cart_summaries(apps, schema_editor):
+    """
+    Computes the summary of every existing cart from its lines.
+    """
+    Cart = apps.get_model('cart', 'Cart')
+    CartItem = apps.get_model('cart', 'CartItem')
+    summaries = {}
+    lines = CartItem.objects.values_list(
+        'cart_id', 'quantity', 'override_price', 'product_id',
+        'product__price', 'product__department__is_taxable',
+        'device__repair_price', 'device__department__is_taxable'
+    )
+    for (cart_id, quantity, override_price, product_id, product_price,
+         product_taxable, device_price, device_taxable) in lines:
+        if override_price is not None:
+            unit_price = override_price
+        elif product_id is not None:
+            unit_price = product_price
+        else:
+            unit_price = device_price or Decimal('0.00')
+        taxable = product_taxable if product_id is not None else bool(device_taxable)
+        line_total = unit_price * quantity
+        tax = (line_total * settings.TAX_RATE).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if taxable else Decimal('0.00')
+        summary = summaries.setdefault(cart_id, [0, Decimal('0.00'), Decimal('0.00')])
+        summary[0] += quantity
+        summary[1] += line_total
+        summary[2] += tax
+    carts = []
+    for cart in Cart.objects.filter(pk__in=summaries):
+        cart.item_count, cart.subtotal, cart.tax = summaries[cart.pk]
+        cart.total = cart.subtotal + cart.tax
+        carts.append(cart)
+    Cart.objects.bulk_update(carts, ['item_count', 'subtotal', 'tax', 'total'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0010_cartitem_unique_product_per_cart_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='tax',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.RunPython(backfill_cart_summaries, migrations.RunPython.noop),
+    ]
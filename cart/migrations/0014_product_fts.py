@@ -0,0 +1,37 @@
+# Generated by Django 4.2.14 on 2026-10-16 22:00
+
+from django.db import migrations
+
+
+def create_product_fts(apps, schema_editor):
+    """
+    Creates and fills the FTS5 index used by cart.search.SQLiteFTS5Backend.
+    Other databases provide their own search backend.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS cart_product_fts USING fts5("
+        "name, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO cart_product_fts (rowid, name, description) "
+        "SELECT id, name, description FROM cart_product"
+    )
+
+
+def drop_product_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS cart_product_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0013_catalog_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_product_fts, drop_product_fts),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.14 on 2026-10-16 22:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0014_product_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('product', 'Product'), ('department', 'Department'), ('location', 'Location')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['updated_at', 'id'], name='location_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='department',
+            index=models.Index(fields=['updated_at', 'id'], name='department_updated_id_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.14 on 2026-10-16 23:20
+
+import cart.models
+from django.db import migrations, models
+
+
+def fill_imei_reversed(apps, schema_editor):
+    Device = apps.get_model('cart', 'Device')
+    devices = []
+    for device in Device.objects.exclude(imei__isnull=True).exclude(imei='').only('pk', 'imei').iterator():
+        device.imei_reversed = device.imei[::-1]
+        devices.append(device)
+    Device.objects.bulk_update(devices, ['imei_reversed'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0015_tombstone_and_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='imei_reversed',
+            field=cart.models.ReversedCharField(blank=True, max_length=15, null=True, source='imei'),
+        ),
+        migrations.RunPython(fill_imei_reversed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['imei'], name='device_imei_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['imei_reversed'], name='device_imei_reversed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['serial_number'], name='device_serial_number_idx'),
+        ),
+    ]
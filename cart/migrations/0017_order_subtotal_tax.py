@@ -0,0 +1,44 @@
+# Generated by Django 4.2.14 on 2026-10-17 10:05
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+
+def backfill_order_amounts(apps, schema_editor):
+    """
+    Fills in the subtotal of every existing order from its items' snapshotted
+    prices; the tax is whatever the stored total charged on top of it.
+    """
+    Order = apps.get_model('cart', 'Order')
+    line_total = ExpressionWrapper(
+        F('items__price') * F('items__quantity'),
+        output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+    orders = []
+    for order in Order.objects.annotate(items_subtotal=Sum(line_total)).iterator():
+        order.subtotal = order.items_subtotal or Decimal('0.00')
+        order.tax = max(order.total - order.subtotal, Decimal('0.00'))
+        orders.append(order)
+    Order.objects.bulk_update(orders, ['subtotal', 'tax'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0016_device_imei_reversed_and_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='tax',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.RunPython(backfill_order_amounts, migrations.RunPython.noop),
+    ]
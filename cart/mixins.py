@@ -0,0 +1,239 @@
+# mixins.py
+
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .caching import model_version, response_cache
+
+# =============================================================================
+# Conditional GET
+# =============================================================================
+
+def make_etag(request, *parts):
+    """
+    Builds a strong ETag from the request path (query string included), the
+    negotiated renderer and the given validator parts.
+    """
+    raw = '|'.join(
+        str(part) for part in (request.get_full_path(), request.accepted_renderer.format, *parts)
+    )
+    return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+
+def conditional_response(request, build_response, last_modified, *parts):
+    """
+    Returns 304 Not Modified when the request's If-None-Match or
+    If-Modified-Since validators still match; otherwise calls
+    ``build_response()`` and sets ETag and Last-Modified on the result.
+    """
+    etag = make_etag(request, last_modified, *parts)
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        return response
+    response = build_response()
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag and Last-Modified to list and retrieve.
+    A paginated list takes its validators from the page it fetched (the
+    newest timestamp and the ids on it), so page N costs the same as page 1
+    and no COUNT is run. An unpaginated list uses one Max(updated_at)/Count
+    query over the filtered queryset (the count catches deletions). Either
+    way an unchanged resource returns 304 without running the serializer.
+    """
+    last_modified_field = 'updated_at'
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return conditional_response(
+                request,
+                lambda: self.get_paginated_response(self.get_serializer(page, many=True).data),
+                max((getattr(obj, self.last_modified_field) for obj in page), default=None),
+                *(obj.pk for obj in page)
+            )
+        stats = queryset.aggregate(
+            last_modified=Max(self.last_modified_field),
+            count=Count('pk')
+        )
+        return conditional_response(
+            request,
+            lambda: Response(self.get_serializer(queryset, many=True).data),
+            stats['last_modified'],
+            stats['count']
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return conditional_response(
+            request,
+            lambda: Response(self.get_serializer(instance).data),
+            getattr(instance, self.last_modified_field),
+            instance.pk
+        )
+
+# =============================================================================
+# Versioned Response Cache
+# =============================================================================
+
+class VersionedResponseCacheMixin:
+    """
+    Caches the rendered bytes of list and retrieve responses under the
+    model's version (see ``caching.model_version``), which every save or
+    delete of the model bumps. A hit, or a 304 for a cached ETag, is served
+    without touching the ORM or the serializer.
+    Only ``cacheable_formats`` are cached (the browsable API's HTML embeds
+    the user and a CSRF token), and each user gets their own entries.
+    Place it before ConditionalGetMixin so its validators are cached too.
+    """
+    response_cache_key = 'response:{label}:{version}:{user}:{format}:{host}:{path}'
+    cacheable_formats = ('json',)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if request.accepted_renderer.format not in self.cacheable_formats:
+            return handler(request, *args, **kwargs)
+        key = self.response_cache_key.format(
+            label=self.queryset.model._meta.label_lower,
+            version=model_version(self.queryset.model),
+            user=request.user.pk if request.user.is_authenticated else 'anon',
+            format=request.accepted_renderer.format,
+            host=request.get_host(),
+            path=request.get_full_path()
+        )
+        cached = response_cache().get(key)
+        if cached is None:
+            self._response_cache_key = key
+            return handler(request, *args, **kwargs)
+
+        content, content_type, etag, last_modified, vary = cached
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=parse_http_date_safe(last_modified) if last_modified else None
+        )
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        if etag:
+            response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = last_modified
+        if vary:
+            response['Vary'] = vary
+        response['X-Cache'] = 'HIT'
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, '_response_cache_key', None)
+        if key is not None and isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            response_cache().set(
+                key,
+                (
+                    response.content, response['Content-Type'], response.get('ETag'),
+                    response.get('Last-Modified'), response.get('Vary')
+                ),
+                getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 3600)
+            )
+            response['X-Cache'] = 'MISS'
+        return response
+
+# =============================================================================
+# Sparse Fieldsets
+# =============================================================================
+
+def serialized_columns(queryset, fields, extra=()):
+    """
+    Restricts ``queryset`` with ``only()`` to the columns read by the given
+    serializer fields (plus the pk, the ordering columns and ``extra``),
+    joining the forward foreign keys that dotted sources such as
+    ``owner.username`` follow. Returns the queryset unchanged when a field's source is not a
+    plain model field, since what it reads cannot be known.
+    """
+    opts = queryset.model._meta
+    names = {opts.pk.name, *extra}
+    related = set()
+    for field in fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            return queryset
+        attrs = field.source_attrs
+        try:
+            model_field = opts.get_field(attrs[0])
+        except FieldDoesNotExist:
+            return queryset
+        if model_field.many_to_many or model_field.one_to_many:
+            continue
+        names.add(model_field.name)
+        if len(attrs) > 1:
+            if not model_field.many_to_one or len(attrs) > 2:
+                return queryset
+            related.add(model_field.name)
+            names.add(f'{model_field.name}__{attrs[1]}')
+    for ordering in queryset.query.order_by:
+        if isinstance(ordering, str):
+            names.add(ordering.lstrip('-'))
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*names)
+
+
+class SparseFieldsetMixin:
+    """
+    Honours ``?fields=a,b`` (keep only these) and ``?omit=c,d`` (drop these)
+    on safe requests. The serializer (see ``SparseFieldsetSerializerMixin``)
+    drops the other fields and the queryset loads only the columns the
+    remaining ones read, so large text columns are neither fetched nor
+    encoded.
+    """
+
+    def get_sparse_fields(self):
+        """
+        Returns (keep, omit) as sets, or None when the request asks for the
+        full representation. ``keep`` is empty when only ``omit`` was given.
+        """
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None
+        params = self.request.query_params
+        keep, omit = (
+            {name.strip() for name in params.get(param, '').split(',') if name.strip()}
+            for param in ('fields', 'omit')
+        )
+        if not keep and not omit:
+            return None
+        return keep, omit
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse_fields'] = self.get_sparse_fields()
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.get_sparse_fields() is None:
+            return queryset
+        extra = [self.last_modified_field] if hasattr(self, 'last_modified_field') else []
+        return serialized_columns(queryset, self.get_serializer().fields, extra)
@@ -1,10 +1,70 @@
 # models.py
 
 from decimal import Decimal
+from functools import reduce
+from operator import or_
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Prefetch, Q
+from django.db.models.functions import Reverse
+from django.utils import timezone
+
+# =============================================================================
+# Change Tracking
+# =============================================================================
+
+class LoadedValuesMixin:
+    """
+    Remembers the field values an instance was loaded or last saved with,
+    so signal handlers can tell which fields a save changed.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def remember_loaded_values(self):
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+        }
+
+    def has_changed(self, *field_names):
+        """
+        Returns True if any of the fields differ from the remembered values.
+        Instances with nothing remembered are treated as changed.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        return any(
+            name not in loaded or loaded[name] != getattr(self, name)
+            for name in field_names
+        )
+
+# =============================================================================
+# Image Validation
+# =============================================================================
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tiff', '.webp')
+IMAGE_MAX_SIZE = 5 * 1024 * 1024  # 5 MB
+
+
+def validate_image_file(file):
+    """
+    Checks the extension and size of an uploaded product or device image.
+    Files whose size is unknown are not checked.
+    """
+    if not file or not hasattr(file, 'size'):
+        return
+    if not file.name.lower().endswith(IMAGE_EXTENSIONS):
+        raise ValidationError('Only .jpg, .jpeg, .tiff, .webp, and .png files are allowed.')
+    if file.size > IMAGE_MAX_SIZE:
+        raise ValidationError('The image file size cannot exceed 5 MB.')
 
 # =============================================================================
 # User Profile Model
@@ -47,6 +107,11 @@ class Location(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='location_updated_id_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -54,7 +119,7 @@ class Location(models.Model):
 # Department Model
 # =============================================================================
 
-class Department(models.Model):
+class Department(LoadedValuesMixin, models.Model):
     """
     Categorizes products and devices into departments.
     """
@@ -64,6 +129,11 @@ class Department(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='department_updated_id_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -71,7 +141,7 @@ class Department(models.Model):
 # Product Model
 # =============================================================================
 
-class Product(models.Model):
+class Product(LoadedValuesMixin, models.Model):
     """
     Represents a product available for sale.
     """
@@ -97,6 +167,14 @@ class Product(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='product_updated_id_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+            models.Index(fields=['is_available', 'updated_at', 'id'], name='product_available_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -106,25 +184,173 @@ class Product(models.Model):
         Validates the image file type and size.
         """
         super().clean()
-        if self.image and hasattr(self.image.file, 'size'):
-            valid_extensions = ('.jpg', '.jpeg', '.png', '.tiff', '.webp')
-            if not self.image.name.lower().endswith(valid_extensions):
-                raise ValidationError('Only .jpg, .jpeg, .tiff, .webp, and .png files are allowed.')
-            if self.image.file.size > 5 * 1024 * 1024:  # Limit size to 5 MB
-                raise ValidationError('The image file size cannot exceed 5 MB.')
+        if self.image:
+            validate_image_file(self.image.file)
 
     def update_inventory(self, inventory_quantity):
         """
-        Updates the inventory quantity of the product.
+        Sets the inventory quantity of the product, writing only on_hand.
+        Use ``adjust_inventory`` for changes relative to the current stock.
         """
         self.on_hand = inventory_quantity
-        self.save()
+        self.save(update_fields=['on_hand', 'updated_at'])
+
+    def adjust_inventory(self, delta, allow_negative=True):
+        """
+        Adds ``delta`` to on_hand atomically in the database and returns the
+        new quantity; see ``cart.inventory.adjust_on_hand``.
+        """
+        from .inventory import adjust_on_hand
+
+        self.on_hand = adjust_on_hand({self.pk: delta}, allow_negative)[self.pk]
+        return self.on_hand
 
 # =============================================================================
 # Device Model
 # =============================================================================
 
-class Device(models.Model):
+class ReversedCharField(models.CharField):
+    """
+    A CharField holding another field's value reversed, filled on every save
+    and bulk_create, so a suffix search on the source becomes an indexed
+    prefix (range) search on this column. Saves with ``update_fields``,
+    ``update()`` and ``bulk_update()`` skip ``pre_save``; Device and
+    DeviceQuerySet cover those paths for ``imei``.
+    """
+
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        kwargs.pop('editable', None)
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.source)
+        value = value[::-1] if value else None
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+def prefix_range(prefix):
+    """
+    Returns (low, high) such that ``low <= value < high`` selects the values
+    starting with ``prefix``; unlike LIKE, a range uses a plain index on
+    every backend.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+DEVICE_UNIQUE_MESSAGES = {
+    'imei': 'Device with this IMEI already exists.',
+    'serial_number': 'Device with this serial number already exists.',
+    'barcode': 'Device with this barcode already exists.',
+}
+
+# Substrings identifying each unique constraint in an IntegrityError, as
+# reported by SQLite (columns) and PostgreSQL (constraint names).
+DEVICE_UNIQUE_VIOLATIONS = (
+    ('imei', ('unique_imei_per_owner', 'cart_device.imei')),
+    ('serial_number', ('unique_serial_number_per_owner', 'cart_device.serial_number')),
+    ('barcode', ('cart_device_barcode', 'cart_device.barcode')),
+)
+
+
+def device_unique_violation_errors(exc):
+    """
+    Maps an IntegrityError raised by a Device write to {field: [message]};
+    empty if it is not one of the device's unique constraints.
+    """
+    text = str(exc)
+    return {
+        field: [DEVICE_UNIQUE_MESSAGES[field]]
+        for field, markers in DEVICE_UNIQUE_VIOLATIONS
+        if any(marker in text for marker in markers)
+    }
+
+
+class DeviceQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        Keeps ``imei_reversed`` in step when ``imei`` is updated in bulk.
+        A plain value is reversed here; an expression is reversed in SQL.
+        """
+        if 'imei' in kwargs and 'imei_reversed' not in kwargs:
+            imei = kwargs['imei']
+            if imei is None or isinstance(imei, str):
+                kwargs['imei_reversed'] = imei[::-1] if imei else None
+            else:
+                kwargs['imei_reversed'] = Reverse(imei)
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        """
+        Adds ``imei_reversed`` when ``imei`` is among the fields, since
+        bulk_update does not run the field's ``pre_save``.
+        """
+        if 'imei' in fields and 'imei_reversed' not in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.imei_reversed = obj.imei[::-1] if obj.imei else None
+            fields = [*fields, 'imei_reversed']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def used_unique_values(self, owner_id, imeis=(), serial_numbers=(), barcodes=(), exclude_pk=None):
+        """
+        Returns {'imei': set, 'serial_number': set, 'barcode': set} of the
+        given values already taken: IMEIs and serial numbers by the owner's
+        devices, barcodes by any device. One query however many values.
+        """
+        imeis, serial_numbers, barcodes = (
+            {value for value in values if value} for values in (imeis, serial_numbers, barcodes)
+        )
+        used = {'imei': set(), 'serial_number': set(), 'barcode': set()}
+        conditions = []
+        if imeis:
+            conditions.append(Q(owner_id=owner_id, imei__in=imeis))
+        if serial_numbers:
+            conditions.append(Q(owner_id=owner_id, serial_number__in=serial_numbers))
+        if barcodes:
+            conditions.append(Q(barcode__in=barcodes))
+        if not conditions:
+            return used
+        queryset = self.filter(reduce(or_, conditions))
+        if exclude_pk is not None:
+            queryset = queryset.exclude(pk=exclude_pk)
+        for row_owner_id, imei, serial_number, barcode in queryset.values_list(
+            'owner_id', 'imei', 'serial_number', 'barcode'
+        ):
+            if row_owner_id == owner_id and imei in imeis:
+                used['imei'].add(imei)
+            if row_owner_id == owner_id and serial_number in serial_numbers:
+                used['serial_number'].add(serial_number)
+            if barcode in barcodes:
+                used['barcode'].add(barcode)
+        return used
+
+    def imei_ending_with(self, digits):
+        """
+        Devices whose IMEI ends with ``digits``, found through the index on
+        the reversed IMEI.
+        """
+        low, high = prefix_range(digits[::-1])
+        return self.filter(imei_reversed__gte=low, imei_reversed__lt=high)
+
+    def unique_conflicts(self, owner_id, imei=None, serial_number=None, barcode=None, exclude_pk=None):
+        """
+        Returns {field: [message]} for the IMEI and serial number already used
+        by the owner and the barcode already used by any device, checked in
+        a single query.
+        """
+        used = self.used_unique_values(owner_id, [imei], [serial_number], [barcode], exclude_pk)
+        return {field: [DEVICE_UNIQUE_MESSAGES[field]] for field, values in used.items() if values}
+
+
+class Device(LoadedValuesMixin, models.Model):
     """
     Represents a device owned by a user, which can be repaired or serviced.
     """
@@ -154,6 +380,12 @@ class Device(models.Model):
         blank=True,
         null=True
     )
+    imei_reversed = ReversedCharField(
+        max_length=15,
+        blank=True,
+        null=True,
+        source='imei'
+    )
     location = models.ForeignKey(
         Location,
         on_delete=models.CASCADE,
@@ -183,12 +415,21 @@ class Device(models.Model):
     passcode = models.CharField(max_length=50, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DeviceQuerySet.as_manager()
     
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=['owner', 'imei'], name='unique_imei_per_owner'),
             models.UniqueConstraint(fields=['owner', 'serial_number'], name='unique_serial_number_per_owner'),
         ]
+        indexes = [
+            models.Index(fields=['owner', 'updated_at', 'id'], name='device_owner_updated_idx'),
+            models.Index(fields=['owner', 'created_at', 'id'], name='device_owner_created_idx'),
+            models.Index(fields=['imei'], name='device_imei_idx'),
+            models.Index(fields=['imei_reversed'], name='device_imei_reversed_idx'),
+            models.Index(fields=['serial_number'], name='device_serial_number_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.device_model}) - Owned by {self.owner.username}"
@@ -196,51 +437,121 @@ class Device(models.Model):
 # =============================================================================
     def clean(self):
         super().clean()
-        # Validate image
-        if self.image and hasattr(self.image.file, 'size'):
-            valid_extensions = ('.jpg', '.jpeg', '.png', '.tiff', '.webp')
-            if not self.image.name.lower().endswith(valid_extensions):
-                raise ValidationError('Only .jpg, .jpeg, .tiff, .webp, and .png files are allowed.')
-            if self.image.file.size > 5 * 1024 * 1024:
-                raise ValidationError('The image file size cannot exceed 5 MB.')
-        # Validate IMEI uniqueness per owner
-        if self.imei and Device.objects.filter(imei=self.imei, owner=self.owner).exclude(pk=self.pk).exists():
-            raise ValidationError({'imei': 'Device with this IMEI already exists.'})
-        # Validate Serial Number uniqueness per owner
-        if self.serial_number and Device.objects.filter(serial_number=self.serial_number, owner=self.owner).exclude(pk=self.pk).exists():
-            raise ValidationError({'serial_number': 'Device with this serial number already exists.'})
+        if self.image:
+            validate_image_file(self.image.file)
+        # Validate IMEI and serial number (per owner) and barcode uniqueness in one query
+        errors = Device.objects.unique_conflicts(
+            self.owner_id, self.imei, self.serial_number, self.barcode, exclude_pk=self.pk
+        )
+        if errors:
+            raise ValidationError(errors)
 # =============================================================================
-    def save(self, *args, **kwargs):
+    def save(self, *args, validate=True, **kwargs):
         """
         Overridden save method to perform full clean before saving.
+        ``clean()`` covers the unique fields and constraints in one query,
+        so Django's own per-constraint checks are skipped. Pass
+        ``validate=False`` for a trusted save from paths that validated the
+        data already. Either way the database constraints have the final
+        word: a violation is raised as a ValidationError on its field.
         """
-        self.full_clean()  # Trigger custom validation
-        super(Device, self).save(*args, **kwargs)
+        if validate:
+            self.full_clean(validate_unique=False, validate_constraints=False)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'imei' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'imei_reversed'}
+        try:
+            with transaction.atomic():
+                super(Device, self).save(*args, **kwargs)
+        except IntegrityError as exc:
+            errors = device_unique_violation_errors(exc)
+            if not errors:
+                raise
+            raise ValidationError(errors)
 
 # =============================================================================
 # Cart and CartItem Models
 # =============================================================================
 
+class CartQuerySet(models.QuerySet):
+    def with_items(self):
+        """
+        Eager-loading plan for the cart read path:
+        cart -> user, cart -> items -> product / device -> owner.
+        Serializing the result costs a constant number of queries.
+        """
+        return self.select_related('user').prefetch_related(
+            Prefetch('items', queryset=CartItem.objects.with_related())
+        )
+
+
 class Cart(models.Model):
     """
     Represents a shopping cart associated with a user.
+    The summary fields (item_count, subtotal, tax, total) are maintained
+    incrementally by the signal handlers in ``cart.signals``; see
+    ``cart.summaries``.
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE)
+    item_count = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    tax = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CartQuerySet.as_manager()
     
     def __str__(self):
         return f"Cart for {self.user.username}"
 
-    @property
-    def total(self):
+
+class CartItemQuerySet(models.QuerySet):
+    def with_related(self):
         """
-        Calculates the total price of all items in the cart.
+        Joins everything CartItemSerializer reads for a line.
         """
-        return sum(item.total_price for item in self.items.all())
-
+        return self.select_related('product', 'device__owner')
 
-class CartItem(models.Model):
+    def add_line(self, cart_id, product=None, device=None, quantity=1, override_price=None):
+        """
+        Adds ``quantity`` to the cart's line for the product or device.
+        An existing line is merged with a single atomic UPDATE
+        (``quantity = quantity + n``); otherwise a new line is inserted. A
+        concurrent insert of the same line is caught by the partial unique
+        constraints and retried as an UPDATE.
+        """
+        if product is not None:
+            lookup = {'cart_id': cart_id, 'product': product}
+        else:
+            lookup = {'cart_id': cart_id, 'device': device}
+        changes = {'quantity': F('quantity') + quantity, 'updated_at': timezone.now()}
+        if override_price is not None:
+            changes['override_price'] = override_price
+
+        from . import summaries
+
+        if not self.filter(**lookup).update(**changes):
+            try:
+                with transaction.atomic():
+                    return self.create(
+                        cart_id=cart_id,
+                        product=product,
+                        device=device,
+                        quantity=quantity,
+                        override_price=override_price
+                    )
+            except IntegrityError:
+                self.filter(**lookup).update(**changes)
+        item = self.with_related().get(**lookup)
+        if override_price is None:
+            summaries.item_merged(item, quantity)
+        else:
+            summaries.recalculate_summaries([cart_id])
+        return item
+
+
+class CartItem(LoadedValuesMixin, models.Model):
     cart = models.ForeignKey(
         Cart,
         related_name='items',
@@ -268,6 +579,22 @@ class CartItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cart', 'product'],
+                condition=Q(product__isnull=False),
+                name='unique_product_per_cart'
+            ),
+            models.UniqueConstraint(
+                fields=['cart', 'device'],
+                condition=Q(device__isnull=False),
+                name='unique_device_per_cart'
+            ),
+        ]
+
     def clean(self):
         super().clean()
         if not self.product and not self.device:
@@ -305,9 +632,21 @@ class CartItem(models.Model):
 # Order and OrderItem Models
 # =============================================================================
 
+class OrderQuerySet(models.QuerySet):
+    def with_items(self):
+        """
+        Eager-loads the user and the items with their product / device.
+        """
+        return self.select_related('user').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product', 'device'))
+        )
+
+
 class Order(models.Model):
     """
     Represents an order placed by a user.
+    ``subtotal``, ``tax`` and ``total`` are snapshotted at checkout, so later
+    price or department changes do not alter a placed order.
     """
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -322,9 +661,19 @@ class Order(models.Model):
         choices=STATUS_CHOICES,
         default='pending'
     )
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    tax = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
     total = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_idx'),
+            models.Index(fields=['user', 'status', 'created_at', 'id'], name='order_user_status_idx'),
+        ]
     
     def __str__(self):
         return f"Order {self.id} - {self.user.username}"
@@ -373,3 +722,29 @@ class OrderItem(models.Model):
         elif self.device:
             return self.device.name
         return 'Unknown Item'
+
+# =============================================================================
+# Deletion Log
+# =============================================================================
+
+class Tombstone(models.Model):
+    """
+    Records the deletion of a synced catalog row, so delta-sync clients can
+    drop it (see ``cart.sync``).
+    """
+    MODEL_CHOICES = (
+        ('product', 'Product'),
+        ('department', 'Department'),
+        ('location', 'Location'),
+    )
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
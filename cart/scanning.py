@@ -0,0 +1,108 @@
+# scanning.py
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db.models import F, IntegerField, Value
+
+from .models import Device, Product
+
+# What a barcode resolves to; ``owner_id`` is None for products.
+ScanResult = namedtuple('ScanResult', ['type', 'id', 'price', 'name', 'owner_id'])
+
+# =============================================================================
+# Barcode LRU
+# =============================================================================
+
+class BarcodeCache:
+    """
+    A bounded, thread-safe LRU of barcode -> ScanResult held in process
+    memory. Entries expire after ``timeout`` seconds, which bounds how long
+    another process can serve a barcode after it changed; saves and deletes
+    in this process drop the entry at once (see ``cart.signals``).
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, barcode):
+        with self._lock:
+            entry = self._entries.get(barcode)
+            if entry is None:
+                return None
+            result, expires = entry
+            if expires < time.monotonic():
+                del self._entries[barcode]
+                return None
+            self._entries.move_to_end(barcode)
+            return result
+
+    def set(self, barcode, result):
+        with self._lock:
+            self._entries[barcode] = (result, time.monotonic() + self.timeout)
+            self._entries.move_to_end(barcode)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, *barcodes):
+        with self._lock:
+            for barcode in barcodes:
+                self._entries.pop(barcode, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+barcode_cache = BarcodeCache(
+    getattr(settings, 'SCAN_CACHE_SIZE', 10000),
+    getattr(settings, 'SCAN_CACHE_TIMEOUT', 60)
+)
+
+# =============================================================================
+# Barcode Resolution
+# =============================================================================
+
+def _lookup(barcode):
+    """
+    Resolves the barcode against products and devices in one UNION query
+    over their unique barcode indexes. A product wins if both match.
+    """
+    products = Product.objects.filter(barcode=barcode).annotate(
+        kind=Value('product'),
+        owner_ref=Value(None, output_field=IntegerField())
+    ).values_list('id', 'price', 'name', 'kind', 'owner_ref')
+    devices = Device.objects.filter(barcode=barcode).annotate(
+        kind=Value('device'),
+        owner_ref=F('owner_id')
+    ).values_list('id', 'repair_price', 'name', 'kind', 'owner_ref')
+    rows = sorted(products.union(devices, all=True), key=lambda row: row[3] != 'product')
+    if not rows:
+        return None
+    pk, price, name, kind, owner_id = rows[0]
+    return ScanResult(kind, pk, price, name, owner_id)
+
+
+def resolve_barcode(barcode):
+    """
+    Returns the ScanResult for the barcode, or None if nothing has it.
+    Hits are served from the in-process LRU without touching the database.
+    """
+    result = barcode_cache.get(barcode)
+    if result is None:
+        result = _lookup(barcode)
+        if result is not None:
+            barcode_cache.set(barcode, result)
+    return result
+
+
+def forget_barcodes(*barcodes):
+    barcode_cache.discard(*(barcode for barcode in barcodes if barcode))
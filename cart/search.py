@@ -0,0 +1,187 @@
+# search.py
+
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache, reduce
+from operator import and_
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+# =============================================================================
+# Search Backends
+# =============================================================================
+
+class ProductSearchBackend(ABC):
+    """
+    Interface of a product full-text search backend.
+    The backend owns its index; ``cart.signals`` keeps it in sync through
+    ``index`` and ``remove``, and ``search`` returns product ids best match
+    first. A PostgreSQL backend would store a tsvector and implement the
+    same four methods.
+    """
+
+    @abstractmethod
+    def index(self, products):
+        """
+        Adds or refreshes the given products in the index.
+        """
+
+    @abstractmethod
+    def remove(self, product_ids):
+        """
+        Drops the given product ids from the index.
+        """
+
+    @abstractmethod
+    def clear(self):
+        """
+        Empties the index before a rebuild.
+        """
+
+    @abstractmethod
+    def search(self, query, limit):
+        """
+        Returns up to ``limit`` matching product ids, best match first.
+        """
+
+
+class ContainsSearchBackend(ProductSearchBackend):
+    """
+    Fallback for databases without a dedicated backend: keeps no index and
+    matches every word of the query with ``icontains`` on the name or the
+    description, name matches first. It scans the table, so it suits small
+    catalogs only.
+    """
+
+    def index(self, products):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query, limit):
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return []
+        in_name = reduce(and_, (Q(name__icontains=term) for term in terms))
+        matches = reduce(and_, (
+            Q(name__icontains=term) | Q(description__icontains=term) for term in terms
+        ))
+        return list(
+            Product.objects.filter(matches).annotate(
+                name_match=Case(When(in_name, then=Value(1)), default=Value(0), output_field=IntegerField())
+            ).order_by('-name_match', 'name', 'pk').values_list('pk', flat=True)[:limit]
+        )
+
+
+class SQLiteFTS5Backend(ProductSearchBackend):
+    """
+    Searches an FTS5 virtual table (created by migration 0014) whose rowid
+    is the product id. Results are ranked with bm25, weighting name matches
+    above description matches, and every term of the query is matched as a
+    prefix so the search can run while the user types.
+    """
+    table = 'cart_product_fts'
+    name_weight = 10.0
+    description_weight = 1.0
+
+    def index(self, products):
+        rows = [(product.pk, product.name, product.description or '') for product in products]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, name, description) VALUES (%s, %s, %s)',
+                rows
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in product_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(self, query, limit):
+        match = self.match_expression(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, %s, %s) LIMIT %s',
+                [match, self.name_weight, self.description_weight, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def match_expression(query):
+        """
+        Turns free text into an FTS5 query of quoted prefix terms, so user
+        input can never be parsed as FTS5 syntax.
+        """
+        terms = re.findall(r'\w+', query)
+        return ' '.join(f'"{term}"*' for term in terms)
+
+
+# The backend used for each database vendor when PRODUCT_SEARCH_BACKEND is unset.
+VENDOR_BACKENDS = {
+    'sqlite': 'cart.search.SQLiteFTS5Backend',
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """
+    Returns the configured backend, or the one for the database vendor,
+    falling back to ContainsSearchBackend.
+    """
+    path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None) or VENDOR_BACKENDS.get(
+        connection.vendor, 'cart.search.ContainsSearchBackend'
+    )
+    return import_string(path)()
+
+# =============================================================================
+# Product Search
+# =============================================================================
+
+def search_products(query, limit=None):
+    """
+    Returns the products matching the query, best match first.
+    """
+    if limit is None:
+        limit = getattr(settings, 'PRODUCT_SEARCH_LIMIT', 25)
+    product_ids = get_search_backend().search(query, limit)
+    products = Product.objects.in_bulk(product_ids)
+    return [products[pk] for pk in product_ids if pk in products]
+
+
+def rebuild_search_index(batch_size=500):
+    """
+    Re-indexes every product in batches of ``batch_size`` and returns the
+    number indexed.
+    """
+    backend = get_search_backend()
+    indexed = 0
+    last_pk = 0
+    with transaction.atomic():
+        backend.clear()
+        while True:
+            batch = list(
+                Product.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'name', 'description')[:batch_size]
+            )
+            if not batch:
+                return indexed
+            backend.index(batch)
+            indexed += len(batch)
+            last_pk = batch[-1].pk
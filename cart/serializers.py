@@ -1,11 +1,66 @@
 # serializers.py
+from decimal import Decimal
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from . import images, summaries
+from .tax import get_taxable_departments, is_taxable, line_tax
 from .models import (
     UserProfile, Location, Department, Product,
-    Device, Cart, CartItem, Order, OrderItem
+    Device, Cart, CartItem, Order, OrderItem,
+    DEVICE_UNIQUE_MESSAGES, device_unique_violation_errors, validate_image_file
 )
 
+# Formats computed Decimal amounts the same way DecimalField columns are rendered.
+money = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+# =============================================================================
+# Sparse Fieldsets
+# =============================================================================
+
+class SparseFieldsetSerializerMixin:
+    """
+    Drops the fields left out by the ``sparse_fields`` context that
+    ``mixins.SparseFieldsetMixin`` puts there for ``?fields=`` / ``?omit=``.
+    ``id`` is always kept.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        sparse_fields = self.context.get('sparse_fields')
+        if not sparse_fields:
+            return
+        keep, omit = sparse_fields
+        for name in list(self.fields):
+            if name != 'id' and ((keep and name not in keep) or name in omit):
+                self.fields.pop(name)
+
+# =============================================================================
+# Image Derivatives
+# =============================================================================
+
+class ImageDerivativesField(serializers.Field):
+    """
+    Renders an image field as {size name: URL} of its derivatives (see
+    ``cart.images``), or null when there is no image.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        urls = images.derivative_urls(value.name, value.storage)
+        request = self.context.get('request')
+        if request is not None:
+            urls = {size: request.build_absolute_uri(url) for size, url in urls.items()}
+        return urls
+
 # =============================================================================
 # UserProfile Serializer
 # =============================================================================
@@ -61,14 +116,17 @@ class DepartmentSerializer(serializers.ModelSerializer):
         model = Department
         fields = ['id', 'name', 'description', 'is_taxable', 'created_at', 'updated_at']
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the Product model.
+    GET requests can trim it with ``?fields=`` / ``?omit=``.
     """
+    image_derivatives = ImageDerivativesField(source='image')
+
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'price', 'description', 'image', 'barcode',
+            'id', 'name', 'price', 'description', 'image', 'image_derivatives', 'barcode',
             'location', 'department', 'is_available', 'on_hand', 'cost',
             'created_at', 'updated_at'
         ]
@@ -81,35 +139,218 @@ class ProductSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Price must be a positive number.")
         return value
 
+class ProductImportRowSerializer(serializers.Serializer):
+    """
+    Validates one row of a product import without touching the database.
+    ``location`` and ``department`` are names, resolved by ``cart.imports``.
+    Fields left out of a row are left unchanged on an existing product.
+    """
+    barcode = serializers.CharField(max_length=100)
+    name = serializers.CharField(max_length=200, required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'), required=False)
+    cost = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    description = serializers.CharField(required=False, allow_blank=True)
+    is_available = serializers.BooleanField(required=False)
+    on_hand = serializers.IntegerField(required=False)
+    location = serializers.CharField(required=False)
+    department = serializers.CharField(required=False)
+
+class InventoryAdjustmentSerializer(serializers.Serializer):
+    """
+    Validates one line of a batch inventory adjustment.
+    """
+    product_id = serializers.IntegerField()
+    delta = serializers.IntegerField()
+
 # =============================================================================
 # Device Serializer
 # =============================================================================
 
-class DeviceSerializer(serializers.ModelSerializer):
+class DeviceSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer for the Device model.
+    GET requests can trim it with ``?fields=`` / ``?omit=``.
+    """
     owner = serializers.CharField(source='owner.username', read_only=True)
+    image_derivatives = ImageDerivativesField(source='image')
     # ... other fields ...
 
     class Meta:
         model = Device
         fields = [
             'id', 'name', 'device_model', 'repair_price', 'location', 'department',
-            'imei', 'serial_number', 'owner', 'image', 'description', 'barcode',
+            'imei', 'serial_number', 'owner', 'image', 'image_derivatives', 'description', 'barcode',
             'defect', 'notes', 'carrier', 'estimated_value', 'passcode',
             'created_at', 'updated_at'
         ]
+        # Uniqueness is checked by validate() in one query.
+        validators = []
+        extra_kwargs = {'barcode': {'validators': []}}
 
-    def validate_imei(self, value):
-        user = self.context['request'].user
-        if Device.objects.filter(imei=value, owner=user).exists():
-            raise serializers.ValidationError('Device with this IMEI already exists.')
-        return value
+    def validate(self, attrs):
+        """
+        Checks IMEI and serial number uniqueness per owner and barcode
+        uniqueness in one query.
+        """
+        attrs = super().validate(attrs)
+        instance = self.instance
+        owner_id = instance.owner_id if instance is not None else self.context['request'].user.pk
+
+        def value(field):
+            return attrs[field] if field in attrs else getattr(instance, field, None)
+
+        errors = Device.objects.unique_conflicts(
+            owner_id,
+            value('imei'),
+            value('serial_number'),
+            value('barcode'),
+            exclude_pk=getattr(instance, 'pk', None)
+        )
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
 
-    def validate_serial_number(self, value):
-        user = self.context['request'].user
-        if Device.objects.filter(serial_number=value, owner=user).exists():
-            raise serializers.ValidationError('Device with this serial number already exists.')
+    def validate_image(self, value):
+        """
+        The image checks of ``Device.clean``, which trusted saves skip.
+        """
+        try:
+            validate_image_file(value)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
         return value
-                
+
+    def create(self, validated_data):
+        return self._trusted_save(Device(**validated_data))
+
+    def update(self, instance, validated_data):
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        return self._trusted_save(instance)
+
+    @staticmethod
+    def _trusted_save(device):
+        """
+        Saves without repeating the model validation this serializer already
+        did; a unique constraint violated by a concurrent write still comes
+        back as a field error.
+        """
+        try:
+            device.save(validate=False)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.message_dict)
+        return device
+
+class DeviceIntakeListSerializer(serializers.ListSerializer):
+    """
+    Validates a list of devices for the requesting owner with one query for
+    locations, one for departments and one for IMEI / serial number /
+    barcode uniqueness. Values repeated inside the list are reported too.
+    """
+
+    def to_internal_value(self, data):
+        """
+        Reports errors per row, aligned with the submitted list.
+        """
+        attrs = super().to_internal_value(data)
+        errors = self.row_errors(attrs)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        for row in attrs:
+            row['location_id'] = row.pop('location', None)
+            row['department_id'] = row.pop('department', None)
+        return attrs
+
+    def row_errors(self, rows):
+        """
+        Returns one error dict per row: unknown locations and departments,
+        values already used and values repeated inside the list.
+        """
+        owner_id = self.context['request'].user.pk
+        location_ids = {row['location'] for row in rows if row.get('location') is not None}
+        department_ids = {row['department'] for row in rows if row.get('department') is not None}
+        locations = set(Location.objects.filter(pk__in=location_ids).values_list('pk', flat=True)) if location_ids else set()
+        departments = set(Department.objects.filter(pk__in=department_ids).values_list('pk', flat=True)) if department_ids else set()
+        used = Device.objects.used_unique_values(
+            owner_id,
+            [row.get('imei') for row in rows],
+            [row.get('serial_number') for row in rows],
+            [row.get('barcode') for row in rows]
+        )
+
+        seen = {field: set() for field in DEVICE_UNIQUE_MESSAGES}
+        errors = []
+        for row in rows:
+            row_errors = {}
+            for field, known in (('location', locations), ('department', departments)):
+                if row.get(field) is not None and row[field] not in known:
+                    row_errors[field] = [f'Invalid pk "{row[field]}" - object does not exist.']
+            for field in DEVICE_UNIQUE_MESSAGES:
+                value = row.get(field)
+                if not value:
+                    continue
+                if value in used[field]:
+                    row_errors[field] = [DEVICE_UNIQUE_MESSAGES[field]]
+                elif value in seen[field]:
+                    row_errors[field] = ['Repeated in this intake.']
+                seen[field].add(value)
+            errors.append(row_errors)
+        return errors
+
+    def create(self, validated_data):
+        """
+        Inserts every device with one bulk_create in one transaction.
+        A unique violation from a concurrent write is reported per row by
+        re-running the checks, which now see the other write.
+        """
+        try:
+            with transaction.atomic():
+                return Device.objects.bulk_create([Device(**row) for row in validated_data])
+        except IntegrityError as exc:
+            violated = device_unique_violation_errors(exc)
+            if not violated:
+                raise
+            errors = self.row_errors(validated_data)
+            if not any(errors):
+                # The other write is gone again; blame every row using the field,
+                # or every row if none of them sets it.
+                errors = [
+                    {field: messages for field, messages in violated.items() if row.get(field)}
+                    for row in validated_data
+                ]
+                if not any(errors):
+                    errors = [dict(violated) for _ in validated_data]
+            raise serializers.ValidationError(errors)
+
+
+class DeviceIntakeSerializer(serializers.ModelSerializer):
+    """
+    Write-only serializer for one device of a bulk intake. Locations,
+    departments and uniqueness are checked for the whole list by
+    DeviceIntakeListSerializer. Blank IMEIs, serial numbers and barcodes are
+    stored as NULL, so they never collide.
+    """
+    location = serializers.IntegerField(required=False, allow_null=True)
+    department = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Device
+        fields = [
+            'name', 'device_model', 'repair_price', 'location', 'department',
+            'imei', 'serial_number', 'description', 'barcode', 'defect',
+            'notes', 'carrier', 'estimated_value', 'passcode'
+        ]
+        validators = []
+        extra_kwargs = {'barcode': {'validators': []}}
+        list_serializer_class = DeviceIntakeListSerializer
+
+    def validate(self, attrs):
+        for field in DEVICE_UNIQUE_MESSAGES:
+            if attrs.get(field) == '':
+                attrs[field] = None
+        return attrs
+
 # =============================================================================
 # Cart and CartItem Serializers
 # =============================================================================
@@ -146,13 +387,14 @@ class CartItemSerializer(serializers.ModelSerializer):
         decimal_places=2,
         read_only=True
     )
+    tax = serializers.SerializerMethodField()
 
     class Meta:
         model = CartItem
         fields = [
             'id', 'cart', 'product', 'device', 'product_id', 'device_id',
             'item_name', 'quantity', 'override_price', 'effective_price',
-            'total_price', 'created_at', 'updated_at'
+            'total_price', 'tax', 'created_at', 'updated_at'
         ]
         extra_kwargs = {
             'cart': {'read_only': True},
@@ -162,9 +404,13 @@ class CartItemSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         """
         Validates that either product_id or device_id is provided, but not both.
+        Partial updates fall back to the line's current product or device.
         """
         product = attrs.get('product')
         device = attrs.get('device')
+        if self.partial and self.instance is not None:
+            product = attrs.get('product', self.instance.product)
+            device = attrs.get('device', self.instance.device)
 
         if not product and not device:
             raise serializers.ValidationError("Either 'product_id' or 'device_id' must be provided.")
@@ -172,6 +418,24 @@ class CartItemSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Only one of 'product_id' or 'device_id' can be provided.")
         return attrs
 
+    def create(self, validated_data):
+        """
+        Merges the quantity into an existing line for the same product or
+        device instead of creating a duplicate line.
+        """
+        return CartItem.objects.add_line(**validated_data)
+
+    def update(self, instance, validated_data):
+        """
+        Saves in a savepoint, so moving the line onto a product or device
+        already in the cart reports an error and leaves the transaction usable.
+        """
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError('This item is already in the cart.')
+
     def get_item_name(self, obj):
         """
         Returns the name of the associated item (product or device).
@@ -182,24 +446,168 @@ class CartItemSerializer(serializers.ModelSerializer):
             return obj.device.name
         return 'Unknown Item'
 
+    def get_tax(self, obj):
+        """
+        Returns the line's tax. The department -> taxable map is loaded once
+        per serialization and shared by every line.
+        """
+        departments = self.context.setdefault('taxable_departments', get_taxable_departments())
+        item = obj.product or obj.device
+        taxable = is_taxable(item.department_id if item else None, departments)
+        return money.to_representation(line_tax(obj.total_price, taxable))
+
 # =============================================================================
 
-class CartSerializer(serializers.ModelSerializer):
+class CartItemBulkListSerializer(serializers.ListSerializer):
     """
-    Serializer for the Cart model.
-    Includes nested serialization of CartItems.
+    Validates a list of cart lines, resolving every referenced product and
+    device with one IN query per model instead of one query per line.
     """
-    items = CartItemSerializer(many=True, read_only=True)
-    total = serializers.DecimalField(
+
+    def to_internal_value(self, data):
+        """
+        Reports unknown ids per line, aligned with the submitted list.
+        """
+        attrs = super().to_internal_value(data)
+        product_ids = {line['product_id'] for line in attrs if line.get('product_id')}
+        device_ids = {line['device_id'] for line in attrs if line.get('device_id')}
+        products = Product.objects.in_bulk(product_ids) if product_ids else {}
+        devices = Device.objects.in_bulk(device_ids) if device_ids else {}
+
+        errors = []
+        for line in attrs:
+            line_errors = {}
+            if line.get('product_id') and line['product_id'] not in products:
+                line_errors['product_id'] = [f'Invalid pk "{line["product_id"]}" - object does not exist.']
+            if line.get('device_id') and line['device_id'] not in devices:
+                line_errors['device_id'] = [f'Invalid pk "{line["device_id"]}" - object does not exist.']
+            errors.append(line_errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        for line in attrs:
+            line['product'] = products.get(line.pop('product_id', None))
+            line['device'] = devices.get(line.pop('device_id', None))
+        return attrs
+
+    def create(self, validated_data):
+        """
+        Merges repeated lines, adds their quantities to lines already in the
+        cart with one bulk UPDATE and inserts the rest with one bulk_create.
+        If a concurrent add inserted one of those lines first, the inserts
+        are retried through ``add_line``, which merges them.
+        """
+        merged = {}
+        for line in validated_data:
+            item = line['product'] or line['device']
+            key = (type(item), item.pk)
+            if key in merged:
+                merged[key]['quantity'] += line['quantity']
+                if line.get('override_price') is not None:
+                    merged[key]['override_price'] = line['override_price']
+            else:
+                merged[key] = dict(line)
+
+        cart_id = validated_data[0]['cart_id']
+        product_ids = [line['product'].pk for line in merged.values() if line['product']]
+        device_ids = [line['device'].pk for line in merged.values() if line['device']]
+        existing = {
+            (Product if item.product_id else Device, item.product_id or item.device_id): item
+            for item in CartItem.objects.filter(cart_id=cart_id).filter(
+                Q(product_id__in=product_ids) | Q(device_id__in=device_ids)
+            )
+        }
+
+        now = timezone.now()
+        to_update, to_create = [], []
+        for key, line in merged.items():
+            item = existing.get(key)
+            if item is None:
+                to_create.append(CartItem(
+                    cart_id=cart_id,
+                    product=line['product'],
+                    device=line['device'],
+                    quantity=line['quantity'],
+                    override_price=line.get('override_price'),
+                ))
+                continue
+            item.quantity = F('quantity') + line['quantity']
+            if line.get('override_price') is not None:
+                item.override_price = line['override_price']
+            item.updated_at = now
+            to_update.append(item)
+
+        if to_update:
+            CartItem.objects.bulk_update(to_update, ['quantity', 'override_price', 'updated_at'])
+        try:
+            with transaction.atomic():
+                created = CartItem.objects.bulk_create(to_create)
+        except IntegrityError:
+            # A concurrent add inserted one of these lines; merge them one by one.
+            with summaries.deferred():
+                created = [
+                    CartItem.objects.add_line(
+                        cart_id,
+                        product=item.product,
+                        device=item.device,
+                        quantity=item.quantity,
+                        override_price=item.override_price
+                    )
+                    for item in to_create
+                ]
+        # bulk writes skip the per-line signals, so rebuild the summary once.
+        summaries.recalculate_summaries([cart_id])
+        return to_update + created
+
+
+class CartItemBulkSerializer(serializers.Serializer):
+    """
+    Write-only serializer for one line of a bulk add-to-cart request.
+    """
+    product_id = serializers.IntegerField(required=False, allow_null=True)
+    device_id = serializers.IntegerField(required=False, allow_null=True)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    override_price = serializers.DecimalField(
         max_digits=10,
         decimal_places=2,
-        read_only=True
+        required=False,
+        allow_null=True
     )
+
+    class Meta:
+        list_serializer_class = CartItemBulkListSerializer
+
+    def validate(self, attrs):
+        """
+        Validates that either product_id or device_id is provided, but not both.
+        """
+        product_id = attrs.get('product_id')
+        device_id = attrs.get('device_id')
+
+        if not product_id and not device_id:
+            raise serializers.ValidationError("Either 'product_id' or 'device_id' must be provided.")
+        if product_id and device_id:
+            raise serializers.ValidationError("Only one of 'product_id' or 'device_id' can be provided.")
+        return attrs
+
+# =============================================================================
+
+class CartSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the Cart model.
+    Includes nested serialization of CartItems. The summary fields are read
+    from the columns stored on the cart.
+    """
+    items = CartItemSerializer(many=True, read_only=True)
     user = serializers.ReadOnlyField(source='user.username')  # Ensure this line is present
 
     class Meta:
         model = Cart
-        fields = ['id', 'user', 'items', 'total', 'created_at', 'updated_at']
+        fields = [
+            'id', 'user', 'items', 'item_count', 'subtotal', 'tax', 'total',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['item_count', 'subtotal', 'tax', 'total']
         
 # =============================================================================
 # Order and OrderItem Serializers
@@ -221,14 +629,16 @@ class OrderItemSerializer(serializers.ModelSerializer):
 class OrderSerializer(serializers.ModelSerializer):
     """
     Serializer for the Order model.
-    Includes nested serialization of OrderItems.
+    Includes nested serialization of OrderItems. ``subtotal``, ``tax`` and
+    ``total`` are the amounts stored at checkout.
     """
     items = OrderItemSerializer(many=True, read_only=True)
     user = serializers.ReadOnlyField(source='user.username')
 
     class Meta:
         model = Order
-        fields = ['id', 'user', 'status', 'total', 'items', 'created_at', 'updated_at']
+        fields = ['id', 'user', 'status', 'subtotal', 'tax', 'total', 'items', 'created_at', 'updated_at']
+        read_only_fields = ['subtotal', 'tax']
 
 # =============================================================================
 # END
\ No newline at end of file
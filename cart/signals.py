@@ -0,0 +1,167 @@
+# signals.py
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import autocomplete, caching, images, scanning, summaries, sync, tax
+from .search import get_search_backend
+from .models import Cart, CartItem, Department, Device, Location, Product
+from .utils import cart_id_cache_key
+
+# =============================================================================
+# Cart Signals
+# =============================================================================
+
+@receiver(post_delete, sender=Cart)
+def forget_cart_id(sender, instance, **kwargs):
+    """
+    Drops the cached cart id so the next request resolves a fresh cart.
+    """
+    cache.delete(cart_id_cache_key(instance.user_id))
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def invalidate_cached_cart(sender, instance, **kwargs):
+    caching.invalidate_carts([instance.cart_id])
+
+# =============================================================================
+# Barcode Scan Signals
+# =============================================================================
+# This section and the next two are registered before the cart summary
+# receivers, which reset the loaded values they compare against.
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Device)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Device)
+def forget_scanned_barcode(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    scanning.forget_barcodes(instance.barcode, loaded.get('barcode'))
+
+# =============================================================================
+# Product Search Signals
+# =============================================================================
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, created, **kwargs):
+    if created or instance.has_changed('name', 'description'):
+        get_search_backend().index([instance])
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def update_autocomplete_index(sender, instance, created, **kwargs):
+    if created or instance.has_changed('name', 'price'):
+        autocomplete.product_changed(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_autocomplete_index(sender, instance, **kwargs):
+    autocomplete.product_deleted(instance.pk)
+
+# =============================================================================
+# Image Derivative Signals
+# =============================================================================
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Device)
+def generate_image_derivatives(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    previous = None if created else getattr(loaded.get('image'), 'name', loaded.get('image'))
+    current = instance.image.name if instance.image else None
+    if current != (previous or None):
+        images.schedule_derivatives(current, replaced=previous)
+
+# =============================================================================
+# Cart Summary Signals
+# =============================================================================
+
+@receiver(post_save, sender=CartItem)
+def update_summary_on_item_save(sender, instance, created, **kwargs):
+    if not summaries.is_deferred():
+        summaries.item_saved(instance, created)
+
+
+@receiver(post_delete, sender=CartItem)
+def update_summary_on_item_delete(sender, instance, origin=None, **kwargs):
+    if summaries.is_deferred():
+        return
+    if origin is None or isinstance(origin, CartItem) or getattr(origin, 'model', None) is CartItem:
+        summaries.item_deleted(instance)
+    else:
+        summaries.item_cascaded(instance, origin)
+
+
+@receiver(post_save, sender=Product)
+def update_carts_on_product_change(sender, instance, created, **kwargs):
+    """
+    Rebuilds the summaries of carts holding the product when its price or
+    department (and so its taxability) changes; any other change only
+    invalidates their cached payloads.
+    """
+    if not created:
+        if instance.has_changed('price', 'department_id'):
+            summaries.recalculate_carts_containing(product=instance)
+        else:
+            caching.invalidate_carts_containing(product=instance)
+    instance.remember_loaded_values()
+
+
+@receiver(post_save, sender=Device)
+def update_carts_on_device_change(sender, instance, created, **kwargs):
+    if not created:
+        if instance.has_changed('repair_price', 'department_id'):
+            summaries.recalculate_carts_containing(device=instance)
+        else:
+            caching.invalidate_carts_containing(device=instance)
+    instance.remember_loaded_values()
+
+
+@receiver(post_save, sender=Department)
+def update_summaries_on_department_change(sender, instance, created, **kwargs):
+    """
+    Drops the cached department -> taxable map and rebuilds the summaries of
+    carts holding items from the department when ``is_taxable`` changed.
+    """
+    tax.forget_taxable_departments()
+    changed = not created and instance.has_changed('is_taxable')
+    instance.remember_loaded_values()
+    if not changed:
+        return
+    cart_ids = CartItem.objects.filter(
+        product__department=instance
+    ).values_list('cart_id', flat=True).union(
+        CartItem.objects.filter(device__department=instance).values_list('cart_id', flat=True)
+    )
+    summaries.recalculate_summaries(cart_ids)
+
+
+@receiver(post_delete, sender=Department)
+def forget_taxable_departments_on_delete(sender, instance, **kwargs):
+    tax.forget_taxable_departments()
+
+# =============================================================================
+# Response Cache Signals
+# =============================================================================
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def bump_response_version(sender, instance, **kwargs):
+    caching.bump_model_version(sender)
+
+# =============================================================================
+# Catalog Sync Signals
+# =============================================================================
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Department)
+@receiver(post_delete, sender=Location)
+def record_catalog_deletion(sender, instance, **kwargs):
+    sync.record_deletion(sender._meta.model_name, instance.pk)
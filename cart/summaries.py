@@ -0,0 +1,245 @@
+# summaries.py
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db.models import F
+from django.utils import timezone
+
+from . import caching
+from .models import Cart, CartItem, Product, Device
+from .tax import ZERO, TaxLine, compute_tax, get_taxable_departments, is_taxable, line_tax
+
+# =============================================================================
+# Line Contributions
+# =============================================================================
+
+def line_summary(quantity, unit_price, taxable):
+    """
+    Returns the (item_count, subtotal, tax) a line contributes to its cart.
+    Prices are coerced to Decimal, since an instance saved with a str or
+    int price keeps that value in memory until it is reloaded.
+    """
+    line_total = (Decimal(str(unit_price)) if unit_price is not None else ZERO) * quantity
+    return quantity, line_total, line_tax(line_total, taxable)
+
+
+def item_is_taxable(product=None, device=None):
+    """
+    A line is taxable when its product's or device's department is taxable.
+    """
+    item = product if product is not None else device
+    return is_taxable(item.department_id if item is not None else None)
+
+
+def item_unit_price(override_price, product=None, device=None):
+    if override_price is not None:
+        return override_price
+    if product is not None:
+        return product.price
+    if device is not None:
+        return device.repair_price or ZERO
+    return ZERO
+
+
+def _loaded_line_summary(item):
+    """
+    Returns the contribution of the line as it was loaded or last saved.
+    """
+    loaded = getattr(item, '_loaded_values', None)
+    if not loaded:
+        return 0, ZERO, ZERO
+    product = device = None
+    if loaded.get('product_id') is not None:
+        product = item.product if loaded['product_id'] == item.product_id else (
+            Product.objects.get(pk=loaded['product_id'])
+        )
+    elif loaded.get('device_id') is not None:
+        device = item.device if loaded['device_id'] == item.device_id else (
+            Device.objects.get(pk=loaded['device_id'])
+        )
+    return line_summary(
+        loaded['quantity'],
+        item_unit_price(loaded['override_price'], product, device),
+        item_is_taxable(product, device)
+    )
+
+
+def _current_line_summary(item):
+    return line_summary(
+        item.quantity,
+        item.effective_price,
+        item_is_taxable(item.product, item.device)
+    )
+
+# =============================================================================
+# Incremental Updates
+# =============================================================================
+
+_deferred = ContextVar('cart_summaries_deferred', default=False)
+
+
+@contextmanager
+def deferred():
+    """
+    Skips the per-line summary updates done by the CartItem signal handlers.
+    The caller must rebuild or reset the affected summaries itself.
+    """
+    token = _deferred.set(True)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+
+
+def is_deferred():
+    return _deferred.get()
+
+
+def apply_delta(cart_id, item_count=0, subtotal=ZERO, tax=ZERO):
+    """
+    Adds a delta to a cart's summary with one atomic UPDATE, touches the
+    cart's timestamp and invalidates its cached payload. Lines merged by
+    ``CartItemQuerySet.add_line`` are queryset updates that fire no
+    signals, so this is their only invalidation.
+    """
+    Cart.objects.filter(pk=cart_id).update(
+        item_count=F('item_count') + item_count,
+        subtotal=F('subtotal') + subtotal,
+        tax=F('tax') + tax,
+        total=F('total') + subtotal + tax,
+        updated_at=timezone.now()
+    )
+    caching.invalidate_carts([cart_id])
+
+
+def reset(cart_id):
+    """
+    Zeroes the summary of a cart whose lines were all removed.
+    """
+    Cart.objects.filter(pk=cart_id).update(
+        item_count=0, subtotal=ZERO, tax=ZERO, total=ZERO, updated_at=timezone.now()
+    )
+    caching.invalidate_carts([cart_id])
+
+
+def item_saved(item, created):
+    """
+    Applies the difference between the saved line and the line as it was
+    loaded. A line moved to another cart is removed from the old cart.
+    """
+    old = (0, ZERO, ZERO) if created else _loaded_line_summary(item)
+    new = _current_line_summary(item)
+    old_cart_id = None if created else (getattr(item, '_loaded_values', None) or {}).get('cart_id')
+    if old_cart_id is not None and old_cart_id != item.cart_id:
+        apply_delta(old_cart_id, *(-value for value in old))
+        old = (0, ZERO, ZERO)
+    apply_delta(item.cart_id, *(n - o for n, o in zip(new, old)))
+    item.remember_loaded_values()
+
+
+def item_deleted(item):
+    old = _loaded_line_summary(item) if getattr(item, '_loaded_values', None) else _current_line_summary(item)
+    apply_delta(item.cart_id, *(-value for value in old))
+
+
+def item_cascaded(item, origin):
+    """
+    Handles a line deleted by the cascade from its cart, product, device
+    or one of their parents (``origin``). The related rows may already be
+    gone, so the line's old contribution cannot be looked up; instead its
+    cart is rebuilt from the remaining lines, once per cart per deletion.
+    A cart deleted with its lines needs nothing.
+    """
+    if isinstance(origin, Cart) or getattr(origin, 'model', None) is Cart:
+        return
+    rebuilt = origin.__dict__.setdefault('_rebuilt_cart_ids', set())
+    if item.cart_id not in rebuilt:
+        rebuilt.add(item.cart_id)
+        recalculate_summaries([item.cart_id])
+
+
+def item_merged(item, quantity):
+    """
+    Applies a quantity merged into an existing line by
+    ``CartItemQuerySet.add_line``; ``item`` is the line after the merge.
+    """
+    unit_price = item.effective_price
+    taxable = item_is_taxable(item.product, item.device)
+    new = line_summary(item.quantity, unit_price, taxable)
+    old = line_summary(item.quantity - quantity, unit_price, taxable)
+    apply_delta(item.cart_id, *(n - o for n, o in zip(new, old)))
+
+# =============================================================================
+# Full Recalculation
+# =============================================================================
+
+def compute_summaries(cart_ids):
+    """
+    Computes {cart_id: (item_count, subtotal, tax, total)} for the given
+    carts from their lines, in one query and one pass over the lines.
+    """
+    lines_by_cart = {cart_id: [] for cart_id in cart_ids}
+    lines = CartItem.objects.filter(cart_id__in=cart_ids).values_list(
+        'cart_id', 'quantity', 'override_price', 'product_id', 'product__price',
+        'product__department_id', 'device__repair_price', 'device__department_id'
+    )
+    for (cart_id, quantity, override_price, product_id, product_price,
+         product_department_id, device_price, device_department_id) in lines:
+        if override_price is not None:
+            unit_price = override_price
+        elif product_id is not None:
+            unit_price = product_price
+        else:
+            unit_price = device_price or ZERO
+        department_id = product_department_id if product_id is not None else device_department_id
+        lines_by_cart[cart_id].append(TaxLine(quantity, unit_price, department_id))
+
+    departments = get_taxable_departments()
+    summaries = {}
+    for cart_id, cart_lines in lines_by_cart.items():
+        result = compute_tax(cart_lines, departments)
+        item_count = sum(line.quantity for line in cart_lines)
+        summaries[cart_id] = (item_count, result.subtotal, result.tax, result.total)
+    return summaries
+
+
+def recalculate_summaries(cart_ids):
+    """
+    Rebuilds the stored summaries of the given carts from their lines.
+    """
+    cart_ids = list(cart_ids)
+    if not cart_ids:
+        return 0
+    now = timezone.now()
+    carts = [
+        Cart(pk=cart_id, item_count=count, subtotal=subtotal, tax=tax, total=total, updated_at=now)
+        for cart_id, (count, subtotal, tax, total) in compute_summaries(cart_ids).items()
+    ]
+    Cart.objects.bulk_update(carts, ['item_count', 'subtotal', 'tax', 'total', 'updated_at'])
+    caching.invalidate_carts(cart_ids)
+    return len(carts)
+
+
+def find_stale_summaries(cart_ids):
+    """
+    Returns the ids of carts whose stored summary differs from their lines.
+    """
+    expected = compute_summaries(cart_ids)
+    stored = Cart.objects.filter(pk__in=expected).values_list(
+        'pk', 'item_count', 'subtotal', 'tax', 'total'
+    )
+    return [
+        cart_id for cart_id, *summary in stored
+        if tuple(summary) != expected[cart_id]
+    ]
+
+
+def recalculate_carts_containing(product=None, device=None):
+    """
+    Rebuilds the summaries of every cart with a line for the product or
+    device, after its price or department changed.
+    """
+    lines = CartItem.objects.filter(product=product) if product is not None else CartItem.objects.filter(device=device)
+    return recalculate_summaries(lines.values_list('cart_id', flat=True).distinct())
@@ -0,0 +1,87 @@
+# sync.py
+
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Department, Location, Product, Tombstone
+from .serializers import DepartmentSerializer, LocationSerializer, ProductSerializer
+
+# =============================================================================
+# Catalog Delta Sync
+# =============================================================================
+
+# (response key, tombstone model name, model, serializer)
+SYNCED_MODELS = (
+    ('locations', 'location', Location, LocationSerializer),
+    ('departments', 'department', Department, DepartmentSerializer),
+    ('products', 'product', Product, ProductSerializer),
+)
+
+
+class InvalidSyncToken(Exception):
+    pass
+
+
+def encode_token(moment):
+    payload = json.dumps({'t': moment.isoformat()}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_token(token):
+    try:
+        moment = datetime.fromisoformat(json.loads(base64.urlsafe_b64decode(token.encode()).decode())['t'])
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise InvalidSyncToken()
+    if timezone.is_naive(moment):
+        raise InvalidSyncToken()
+    return moment
+
+
+def catalog_changes(token, context):
+    """
+    Returns the catalog rows created or updated since ``token`` and the ids
+    deleted since then, with the token to send next time. Without a token,
+    or with one older than SYNC_TOMBSTONE_RETENTION, the full catalog is
+    returned with ``full`` set, and the client should replace its copy.
+
+    Each model is read through its (updated_at, id) index and deletions
+    through the Tombstone (model, deleted_at) index. Reads start
+    SYNC_OVERLAP seconds before the token, so rows saved by transactions
+    still open when the token was issued are sent (again) next time.
+    """
+    now = timezone.now()
+    since = decode_token(token) if token else None
+    retention = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+    full = since is None or since < now - retention
+    if not full:
+        since -= timedelta(seconds=getattr(settings, 'SYNC_OVERLAP', 5))
+
+    response = {'token': encode_token(now), 'full': full, 'deleted': {}}
+    for key, model_name, model, serializer_class in SYNCED_MODELS:
+        queryset = model.objects.order_by('updated_at', 'id')
+        if not full:
+            queryset = queryset.filter(updated_at__gte=since)
+        response[key] = serializer_class(queryset, many=True, context=context).data
+        response['deleted'][key] = [] if full else list(
+            Tombstone.objects.filter(model=model_name, deleted_at__gte=since).values_list('object_id', flat=True)
+        )
+    return response
+
+
+def record_deletion(model_name, object_id):
+    Tombstone.objects.create(model=model_name, object_id=object_id)
+
+
+def prune_tombstones():
+    """
+    Deletes tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS; clients
+    with older tokens get a full sync instead.
+    """
+    retention = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - retention).delete()
+    return deleted
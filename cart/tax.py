@@ -0,0 +1,86 @@
+# tax.py
+
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Department
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+TAXABLE_DEPARTMENTS_CACHE_KEY = 'tax:taxable_departments'
+TAXABLE_DEPARTMENTS_TIMEOUT = 300
+
+# A line to be taxed; ``department_id`` may be None (never taxed).
+TaxLine = namedtuple('TaxLine', ['quantity', 'unit_price', 'department_id'])
+
+# The result of taxing a list of lines; ``line_taxes`` is aligned with the input.
+TaxResult = namedtuple('TaxResult', ['line_taxes', 'subtotal', 'tax', 'total'])
+
+# =============================================================================
+# Department Taxability
+# =============================================================================
+
+def get_taxable_departments():
+    """
+    Returns {department_id: is_taxable}, cached until a Department is saved
+    or deleted (see ``cart.signals``).
+    """
+    departments = cache.get(TAXABLE_DEPARTMENTS_CACHE_KEY)
+    if departments is None:
+        departments = dict(Department.objects.values_list('id', 'is_taxable'))
+        cache.set(TAXABLE_DEPARTMENTS_CACHE_KEY, departments, TAXABLE_DEPARTMENTS_TIMEOUT)
+    return departments
+
+
+def forget_taxable_departments():
+    cache.delete(TAXABLE_DEPARTMENTS_CACHE_KEY)
+
+
+def is_taxable(department_id, departments=None):
+    """
+    Returns whether items in the department are taxed. Items without a
+    department are not taxed.
+    """
+    if department_id is None:
+        return False
+    if departments is None:
+        departments = get_taxable_departments()
+    if department_id not in departments:
+        forget_taxable_departments()
+        departments = get_taxable_departments()
+    return departments.get(department_id, False)
+
+# =============================================================================
+# Tax Computation
+# =============================================================================
+
+def line_tax(line_total, taxable):
+    """
+    Returns the tax for one line, rounded half-up to the cent.
+    """
+    if not taxable:
+        return ZERO
+    return (line_total * settings.TAX_RATE).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def compute_tax(lines, departments=None):
+    """
+    Taxes a list of TaxLine in one pass. The cart-level tax is the sum of
+    the per-line taxes, so it always matches what is shown per line.
+    """
+    if departments is None:
+        departments = get_taxable_departments()
+    line_taxes = []
+    subtotal = ZERO
+    tax = ZERO
+    for line in lines:
+        line_total = (line.unit_price or ZERO) * line.quantity
+        taxed = line_tax(line_total, is_taxable(line.department_id, departments))
+        line_taxes.append(taxed)
+        subtotal += line_total
+        tax += taxed
+    return TaxResult(line_taxes, subtotal, tax, subtotal + tax)
@@ -0,0 +1,22 @@
+# tests/conftest.py
+
+import pytest
+from django.core.cache import cache
+
+from cart.autocomplete import reset_index
+from cart.scanning import barcode_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Clears the caches between tests so cached ids and payloads never leak
+    across tests that reuse primary keys.
+    """
+    cache.clear()
+    barcode_cache.clear()
+    reset_index()
+    yield
+    cache.clear()
+    barcode_cache.clear()
+    reset_index()
@@ -0,0 +1,108 @@
+# =============================================================================
+# Tests for Product-Name Autocomplete
+# =============================================================================
+# tests/test_autocomplete.py
+
+from decimal import Decimal
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cart.autocomplete import PrefixIndex, autocomplete, get_index
+from cart.factories import ProductFactory, UserFactory
+
+
+class TestPrefixIndex:
+    """
+    Test suite for the PrefixIndex structure.
+    """
+
+    def test_matches_name_and_word_prefixes(self):
+        """
+        Test that prefixes match the start of the name or of any later word,
+        ignoring case and accents.
+        """
+        index = PrefixIndex(10 ** 6)
+        index.load([(1, 'iPhone Case', Decimal('1')), (2, 'Café Crème', Decimal('2')), (3, 'Case Cover', Decimal('3'))])
+
+        assert [match[0] for match in index.search('CAS', 10)] == [1, 3]
+        assert [match[0] for match in index.search('cafe cr', 10)] == [2]
+        assert [match[0] for match in index.search('c', 2)] == [2, 1]
+        assert index.search('  ', 10) == []
+
+    def test_incremental_updates(self):
+        """
+        Test that add replaces a product's keys and discard removes them.
+        """
+        index = PrefixIndex(10 ** 6)
+        index.load([(1, 'iPhone Case', Decimal('1'))])
+        index.add(1, 'Galaxy Case', Decimal('5'))
+        assert index.search('iph', 10) == []
+        assert index.search('gal', 10) == [(1, 'Galaxy Case', Decimal('5'))]
+
+        index.discard(1)
+        assert index.search('case', 10) == []
+        assert index.memory_usage == 0
+
+    def test_memory_budget(self):
+        """
+        Test that products beyond the memory budget are left out and reported.
+        """
+        index = PrefixIndex(400)
+        index.load([(1, 'Cable', Decimal('1')), (2, 'Charger', Decimal('2')), (3, 'Case', Decimal('3'))])
+        assert len(index) < 3
+        assert index.memory_usage <= 400
+        assert not index.complete
+
+
+@pytest.mark.django_db
+class TestAutocomplete:
+    """
+    Test suite for the process-wide index and the autocomplete action.
+    """
+
+    def test_index_follows_signals(self):
+        """
+        Test that saves and deletes update a built index in place.
+        """
+        product = ProductFactory(name='Screen Protector', price='9.99')
+        assert [match[0] for match in autocomplete('scr')] == [product.id]
+
+        product.name = 'Tempered Glass'
+        product.save()
+        assert autocomplete('scr') == []
+        assert [match[0] for match in autocomplete('temp')] == [product.id]
+
+        product.delete()
+        assert autocomplete('temp') == []
+
+    def test_endpoint_does_not_query_products(self):
+        """
+        Test that a built index answers without touching the database.
+        """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        product = ProductFactory(name='Wireless Charger', price='19.50')
+        get_index()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('product-autocomplete'), {'q': 'wire'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == [{'id': product.id, 'name': 'Wireless Charger', 'price': '19.50'}]
+        assert not [query for query in queries if 'cart_product' in query['sql']]
+
+    def test_rebuild_command(self):
+        """
+        Test that the command rebuilds the index from scratch.
+        """
+        product = ProductFactory(name='Headphones')
+        Product = type(product)
+        Product.objects.filter(pk=product.pk).update(name='Earbuds')
+
+        call_command('rebuild_autocomplete')
+        assert autocomplete('head') == []
+        assert [match[0] for match in autocomplete('ear')] == [product.id]
@@ -2,6 +2,9 @@
 
 import pytest
 from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db import IntegrityError
 from cart.factories import (
     UserFactory,
     CartFactory,
@@ -10,6 +13,8 @@ from cart.factories import (
     DeviceFactory,
     CartItemWithDeviceFactory
 )
+from cart.models import Cart, CartItem
+from cart.summaries import find_stale_summaries
 
 # =============================================================================
 # Tests for Cart and CartItem Models
@@ -38,9 +43,10 @@ class TestCartModel:
         cart = CartFactory(user=user)
 
         # Add a product item to the cart
-        product = ProductFactory(price=Decimal('100.00'))
+        product = ProductFactory(price=Decimal('100.00'), department__is_taxable=False)
         cart_item = CartItemWithProductFactory(cart=cart, product=product, quantity=2)
 
+        cart.refresh_from_db()
         assert cart.total == Decimal('200.00')
 
     def test_cart_total_with_device_items(self):
@@ -51,9 +57,10 @@ class TestCartModel:
         cart = CartFactory(user=user)
 
         # Add a device item to the cart
-        device = DeviceFactory(repair_price=Decimal('150.00'))
+        device = DeviceFactory(repair_price=Decimal('150.00'), department__is_taxable=False)
         cart_item = CartItemWithDeviceFactory(cart=cart, device=device, quantity=1)
 
+        cart.refresh_from_db()
         assert cart.total == Decimal('150.00')
 
     def test_cart_total_with_mixed_items(self):
@@ -64,16 +71,100 @@ class TestCartModel:
         cart = CartFactory(user=user)
 
         # Add a product item
-        product = ProductFactory(price=Decimal('50.00'))
+        product = ProductFactory(price=Decimal('50.00'), department__is_taxable=False)
         CartItemWithProductFactory(cart=cart, product=product, quantity=2)
 
         # Add a device item
-        device = DeviceFactory(repair_price=Decimal('75.00'))
+        device = DeviceFactory(repair_price=Decimal('75.00'), department__is_taxable=False)
         CartItemWithDeviceFactory(cart=cart, device=device, quantity=1)
 
         expected_total = (Decimal('50.00') * 2) + (Decimal('75.00') * 1)
+        cart.refresh_from_db()
         assert cart.total == expected_total
 
+    def test_cart_summary_accepts_unsaved_str_prices(self):
+        """
+        Test that a product created with a str price can be added to a cart.
+        """
+        cart = CartFactory()
+        product = ProductFactory(price='10.00', department__is_taxable=True)
+        CartItemWithProductFactory(cart=cart, product=product, quantity=2)
+
+        cart.refresh_from_db()
+        assert cart.subtotal == Decimal('20.00')
+        assert cart.tax == Decimal('1.80')
+
+    def test_deleting_catalog_rows_held_in_a_cart(self):
+        """
+        Test that deleting a product, a device or a department whose items
+        sit in a cart removes the lines and rebuilds the summary.
+        """
+        cart = CartFactory()
+        product_item = CartItemWithProductFactory(cart=cart, product__price=Decimal('10.00'), quantity=2)
+        device_item = CartItemWithDeviceFactory(cart=cart, device__repair_price=Decimal('30.00'), quantity=1)
+        kept = CartItemWithProductFactory(cart=cart, product__price=Decimal('5.00'), product__department__is_taxable=False, quantity=1)
+
+        product_item.product.delete()
+        device_item.device.delete()
+        cart.refresh_from_db()
+        assert list(cart.items.values_list('pk', flat=True)) == [kept.pk]
+        assert cart.item_count == 1
+        assert cart.total == Decimal('5.00')
+
+        kept.product.department.delete()
+        cart.refresh_from_db()
+        assert cart.item_count == 0
+        assert cart.total == Decimal('0.00')
+
+    def test_cart_summary_is_maintained(self):
+        """
+        Test that the stored summary follows line changes, taxing only taxable departments.
+        """
+        cart = CartFactory()
+        taxable = ProductFactory(price=Decimal('10.00'), department__is_taxable=True)
+        exempt = ProductFactory(price=Decimal('20.00'), department__is_taxable=False)
+        taxable_item = CartItemWithProductFactory(cart=cart, product=taxable, quantity=3)
+        CartItemWithProductFactory(cart=cart, product=exempt, quantity=1)
+
+        cart.refresh_from_db()
+        assert cart.item_count == 4
+        assert cart.subtotal == Decimal('50.00')
+        assert cart.tax == Decimal('2.70')
+        assert cart.total == Decimal('52.70')
+
+        taxable_item.quantity = 1
+        taxable_item.save()
+        taxable.price = Decimal('12.00')
+        taxable.save()
+        cart.refresh_from_db()
+        assert cart.item_count == 2
+        assert cart.subtotal == Decimal('32.00')
+        assert cart.tax == Decimal('1.08')
+
+        taxable_item.delete()
+        cart.refresh_from_db()
+        assert cart.item_count == 1
+        assert cart.total == Decimal('20.00')
+        assert find_stale_summaries([cart.pk]) == []
+
+    def test_rebuild_cart_summaries_command(self):
+        """
+        Test that the management command reports and repairs stale summaries.
+        """
+        cart = CartFactory()
+        CartItemWithProductFactory(cart=cart, product=ProductFactory(price=Decimal('10.00')), quantity=2)
+        Cart.objects.filter(pk=cart.pk).update(item_count=0, subtotal=0, tax=0, total=0)
+
+        output = StringIO()
+        call_command('rebuild_cart_summaries', '--verify', stdout=output)
+        assert f'Cart {cart.pk} has a stale summary.' in output.getvalue()
+
+        call_command('rebuild_cart_summaries', '--batch-size', '1', stdout=StringIO())
+        cart.refresh_from_db()
+        assert cart.item_count == 2
+        assert cart.subtotal == Decimal('20.00')
+        assert find_stale_summaries([cart.pk]) == []
+
 # =============================================================================
 @pytest.mark.django_db
 class TestCartItemModel:
@@ -120,3 +211,24 @@ class TestCartItemModel:
 
         assert cart_item.effective_price == Decimal('80.00')
         assert cart_item.effective_price != original_price
+
+    def test_cart_item_add_line_merges_quantity(self):
+        """
+        Test that add_line updates the existing line instead of inserting a duplicate.
+        """
+        cart_item = CartItemWithProductFactory(quantity=2)
+
+        merged = CartItem.objects.add_line(cart_item.cart_id, product=cart_item.product, quantity=3)
+
+        assert merged.pk == cart_item.pk
+        assert merged.quantity == 5
+        assert CartItem.objects.count() == 1
+
+    def test_cart_item_unique_per_cart(self):
+        """
+        Test that the database rejects a second line for the same product in a cart.
+        """
+        cart_item = CartItemWithProductFactory()
+
+        with pytest.raises(IntegrityError):
+            CartItem.objects.create(cart=cart_item.cart, product=cart_item.product, quantity=1)
@@ -6,10 +6,16 @@
 from decimal import Decimal
 import pytest
 from rest_framework.test import APIClient
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from cart.factories import CartFactory, CartItemWithDeviceFactory, CartItemWithProductFactory, DeviceFactory, ProductFactory, UserFactory
-from cart.models import CartItem
+from cart.caching import cache_stats, reset_cache_stats
+from cart.models import Cart, CartItem, Order, Product
+from cart.utils import cart_id_cache_key
+from django.core.cache import cache
 
 @pytest.mark.django_db
 class TestCartViewSet:
@@ -52,6 +58,134 @@ class TestCartViewSet:
         assert response.status_code == 200
         assert response.data['user'] == user.username
 
+    def test_my_cart_query_count_is_constant(self):
+        """
+        Test that my_cart uses the same number of queries regardless of the number of lines.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+
+        cart = CartFactory(user=user)
+        CartItemWithProductFactory(cart=cart)
+        CartItemWithDeviceFactory(cart=cart)
+
+        url = reverse('cart-my-cart')
+        with CaptureQueriesContext(connection) as small_cart:
+            response = client.get(url)
+        assert len(response.data['items']) == 2
+
+        CartItemWithProductFactory.create_batch(10, cart=cart)
+        CartItemWithDeviceFactory.create_batch(10, cart=cart)
+
+        with CaptureQueriesContext(connection) as large_cart:
+            response = client.get(url)
+        assert len(response.data['items']) == 22
+        assert len(large_cart.captured_queries) == len(small_cart.captured_queries)
+        assert Decimal(response.data['subtotal']) == sum(
+            Decimal(item['total_price']) for item in response.data['items']
+        )
+
+    def test_checkout(self):
+        """
+        Test that checkout creates an order with snapshotted prices, decrements stock and clears the cart.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+
+        cart = CartFactory(user=user)
+        product = ProductFactory(price=Decimal('10.00'), on_hand=5, department__is_taxable=True)
+        device = DeviceFactory(repair_price=Decimal('50.00'), department__is_taxable=False)
+        CartItemWithProductFactory(cart=cart, product=product, quantity=2)
+        CartItemWithDeviceFactory(cart=cart, device=device, quantity=1)
+
+        response = client.post(reverse('cart-checkout'))
+
+        assert response.status_code == 201
+        assert response.data['total'] == '71.80'
+        assert (response.data['subtotal'], response.data['tax']) == ('70.00', '1.80')
+        assert len(response.data['items']) == 2
+        order = Order.objects.get(user=user)
+        assert (order.subtotal, order.tax, order.total) == (Decimal('70.00'), Decimal('1.80'), Decimal('71.80'))
+        assert Product.objects.get(pk=product.pk).on_hand == 3
+        cart.refresh_from_db()
+        assert not cart.items.exists()
+        assert (cart.item_count, cart.total) == (0, Decimal('0.00'))
+
+    def test_checkout_rejects_insufficient_stock(self):
+        """
+        Test that checkout rolls back when a product does not have enough stock.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+
+        cart_item = CartItemWithProductFactory(cart__user=user, product__on_hand=1, quantity=2)
+        response = client.post(reverse('cart-checkout'))
+
+        assert response.status_code == 409
+        assert response.data['product_ids'] == [cart_item.product.id]
+        assert not Order.objects.exists()
+        assert CartItem.objects.filter(pk=cart_item.pk).exists()
+        assert Product.objects.get(pk=cart_item.product.pk).on_hand == 1
+
+    def test_checkout_empty_cart(self):
+        """
+        Test that checking out an empty cart is rejected.
+        """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+
+        response = client.post(reverse('cart-checkout'))
+        assert response.status_code == 400
+
+    def test_checkout_query_count_is_bounded(self):
+        """
+        Test that checkout uses the same number of queries for small and large carts.
+        """
+        counts = []
+        for size in (1, 10):
+            client = APIClient()
+            user = UserFactory()
+            client.force_authenticate(user=user)
+            cart = CartFactory(user=user)
+            CartItemWithProductFactory.create_batch(size, cart=cart, product__on_hand=100)
+            CartItemWithDeviceFactory.create_batch(size, cart=cart)
+
+            with CaptureQueriesContext(connection) as queries:
+                response = client.post(reverse('cart-checkout'))
+            assert response.status_code == 201
+            counts.append(len(queries.captured_queries))
+        assert counts[0] == counts[1]
+
+    def test_my_cart_is_served_from_cache(self):
+        """
+        Test that my_cart caches the serialized cart and invalidates it when the cart or a product changes.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+        cart_item = CartItemWithProductFactory(cart__user=user, quantity=1)
+        reset_cache_stats()
+
+        url = reverse('cart-my-cart')
+        assert client.get(url)['X-Cache'] == 'MISS'
+        assert client.get(url)['X-Cache'] == 'HIT'
+        assert cache_stats() == {'hits': 1, 'misses': 1}
+
+        CartItemWithProductFactory(cart=cart_item.cart)
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert len(response.data['items']) == 2
+
+        product = Product.objects.get(pk=cart_item.product.pk)
+        product.name = 'Renamed'
+        product.save()
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert 'Renamed' in [item['item_name'] for item in response.data['items']]
+
 @pytest.mark.django_db
 class TestCartItemViewSet:
     """
@@ -140,3 +274,212 @@ class TestCartItemViewSet:
         assert response.status_code == 204
         assert CartItem.objects.count() == 0
 
+
+    def test_cart_is_resolved_once_and_cached(self):
+        """
+        Test that adding items creates a single cart and later requests skip the cart lookup.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+
+        url = reverse('cartitem-list')
+        client.post(url, {'product_id': ProductFactory().id, 'quantity': 1}, format='json')
+        client.post(url, {'product_id': ProductFactory().id, 'quantity': 1}, format='json')
+        assert Cart.objects.filter(user=user).count() == 1
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert len(response.data) == 2
+        assert not any('FROM "cart_cart"' in query['sql'] for query in queries.captured_queries)
+
+    def test_stale_cached_cart_id_is_re_resolved(self):
+        """
+        Test that a cart id cached by another process for a deleted cart
+        does not break adding, listing or checking out.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+        url = reverse('cartitem-list')
+        client.post(url, {'product_id': ProductFactory().id, 'quantity': 1}, format='json')
+        stale = Cart.objects.get(user=user)
+        stale_id = stale.pk
+        stale.delete()
+        cache.set(cart_id_cache_key(user.pk), stale_id)
+
+        response = client.post(url, {'product_id': ProductFactory(on_hand=5).id, 'quantity': 1}, format='json')
+        assert response.status_code == 201
+        cart = Cart.objects.get(user=user)
+        assert cart.pk != stale_id
+        assert len(client.get(url).data) == 1
+
+        cache.set(cart_id_cache_key(user.pk), stale_id)
+        assert client.post(reverse('cart-checkout')).status_code == 201
+
+    def test_bulk_add_cart_items(self):
+        """
+        Test that a list of lines is added in one request and the refreshed cart is returned.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+
+        products = ProductFactory.create_batch(3, price=Decimal('10.00'))
+        device = DeviceFactory(repair_price=Decimal('40.00'))
+        data = [{'product_id': product.id, 'quantity': 2} for product in products]
+        data.append({'device_id': device.id, 'quantity': 1, 'override_price': '25.00'})
+
+        url = reverse('cartitem-bulk')
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(url, data, format='json')
+
+        assert response.status_code == 201
+        assert len(response.data['items']) == 4
+        assert Decimal(response.data['subtotal']) == Decimal('85.00')
+        assert response.data['item_count'] == 7
+        assert CartItem.objects.filter(cart__user=user).count() == 4
+        assert sum('INSERT INTO "cart_cartitem"' in query['sql'] for query in queries.captured_queries) == 1
+
+    def test_bulk_add_rejects_unknown_items(self):
+        """
+        Test that unknown product or device ids are reported per line and nothing is written.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+
+        product = ProductFactory()
+        data = [
+            {'product_id': product.id, 'quantity': 1},
+            {'product_id': product.id + 1000, 'quantity': 1},
+            {'device_id': 999999, 'quantity': 1},
+        ]
+        response = client.post(reverse('cartitem-bulk'), data, format='json')
+
+        assert response.status_code == 400
+        assert response.data[0] == {}
+        assert 'product_id' in response.data[1]
+        assert 'device_id' in response.data[2]
+        assert CartItem.objects.count() == 0
+
+        response = client.post(reverse('cartitem-bulk'), [{'quantity': 1}], format='json')
+        assert response.status_code == 400
+        assert 'non_field_errors' in response.data[0]
+
+    def test_adding_same_product_merges_lines(self):
+        """
+        Test that adding a product already in the cart increases the quantity of the existing line.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+
+        product = ProductFactory(price=Decimal('5.00'))
+        url = reverse('cartitem-list')
+        client.post(url, {'product_id': product.id, 'quantity': 2}, format='json')
+        response = client.post(url, {'product_id': product.id, 'quantity': 3}, format='json')
+
+        assert response.status_code == 201
+        assert response.data['quantity'] == 5
+        assert CartItem.objects.filter(cart__user=user).count() == 1
+        assert CartItem.objects.get(cart__user=user).total_price == Decimal('25.00')
+
+    def test_merged_line_invalidates_cached_cart(self):
+        """
+        Test that my_cart is rebuilt after an add is merged into an existing line.
+        """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        product = ProductFactory(price=Decimal('10.00'), department__is_taxable=False)
+        url = reverse('cartitem-list')
+        client.post(url, {'product_id': product.id, 'quantity': 1}, format='json')
+        assert client.get(reverse('cart-my-cart'))['X-Cache'] == 'MISS'
+
+        client.post(url, {'product_id': product.id, 'quantity': 2}, format='json')
+        response = client.get(reverse('cart-my-cart'))
+        assert response['X-Cache'] == 'MISS'
+        assert response.data['items'][0]['quantity'] == 3
+        assert Decimal(response.data['total']) == Decimal('30.00')
+
+    def test_moving_a_line_onto_an_existing_one_is_rejected(self):
+        """
+        Test that pointing a line at a product already in the cart returns
+        400 and leaves the transaction usable.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+        first = CartItemWithProductFactory(cart__user=user)
+        second = CartItemWithProductFactory(cart=first.cart)
+
+        response = client.patch(
+            reverse('cartitem-detail', args=[second.id]), {'product_id': first.product.id}, format='json'
+        )
+        assert response.status_code == 400
+        second.refresh_from_db()
+        assert second.product_id != first.product_id
+        assert CartItem.objects.filter(cart=first.cart).count() == 2
+
+    def test_bulk_add_merges_repeated_lines(self):
+        """
+        Test that the bulk endpoint merges repeated lines and lines already in the cart.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+
+        in_cart = CartItemWithProductFactory(cart__user=user, quantity=1)
+        product = ProductFactory()
+        data = [
+            {'product_id': in_cart.product.id, 'quantity': 2},
+            {'product_id': product.id, 'quantity': 1},
+            {'product_id': product.id, 'quantity': 4},
+        ]
+        response = client.post(reverse('cartitem-bulk'), data, format='json')
+
+        assert response.status_code == 201
+        quantities = dict(CartItem.objects.filter(cart__user=user).values_list('product_id', 'quantity'))
+        assert quantities == {in_cart.product.id: 3, product.id: 5}
+
+    def test_bulk_add_merges_a_concurrently_added_line(self, monkeypatch):
+        """
+        Test that a line inserted between the bulk add's lookup and its
+        insert is merged instead of failing.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+        in_cart = CartItemWithProductFactory(cart__user=user, quantity=2)
+        # Make the lookup of existing lines miss it, as if it was added after.
+        monkeypatch.setattr('cart.serializers.Q', lambda **kwargs: Q(pk__in=[]))
+
+        data = [{'product_id': in_cart.product.id, 'quantity': 3}]
+        response = client.post(reverse('cartitem-bulk'), data, format='json')
+
+        assert response.status_code == 201
+        assert list(CartItem.objects.filter(cart__user=user).values_list('quantity', flat=True)) == [5]
+        assert response.data['item_count'] == 5
+
+    def test_my_cart_conditional_get(self):
+        """
+        Test that my_cart returns 304 for an unchanged cart and a new ETag after a change.
+        """
+        client = APIClient()
+        user = UserFactory()
+        client.force_authenticate(user=user)
+        cart_item = CartItemWithProductFactory(cart__user=user, quantity=1)
+
+        url = reverse('cart-my-cart')
+        response = client.get(url)
+        etag = response['ETag']
+        assert response.status_code == 200
+        assert 'Last-Modified' in response
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        client.patch(reverse('cartitem-detail', args=[cart_item.id]), {'quantity': 2}, format='json')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
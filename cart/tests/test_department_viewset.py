@@ -5,7 +5,7 @@ import pytest
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from cart.factories import DepartmentFactory
+from cart.factories import DepartmentFactory, UserFactory
 
 @pytest.mark.django_db
 class TestDepartmentViewSet:
@@ -46,3 +46,21 @@ class TestDepartmentViewSet:
         response = self.client.post(self.url, data, format='json')
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert 'name' in response.data
+
+    def test_retrieve_is_cached_until_a_department_changes(self):
+        """
+        Test that retrieve is cached and that saving the department invalidates it.
+        """
+        self.client.force_authenticate(user=UserFactory())
+        department = DepartmentFactory(is_taxable=True)
+        url = reverse('department-detail', args=[department.id])
+
+        assert self.client.get(url)['X-Cache'] == 'MISS'
+        assert self.client.get(url)['X-Cache'] == 'HIT'
+
+        department.is_taxable = False
+        department.save()
+        response = self.client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.data['is_taxable'] is False
+
@@ -2,8 +2,11 @@
 
 import pytest
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
 from cart.factories import DeviceFactory
+from cart.models import Device
 from PIL import Image
 from io import BytesIO
 
@@ -122,4 +125,74 @@ class TestDeviceModel:
         expected_error = "Device with this serial number already exists."
         actual_error = errors['serial_number'][0]
         assert actual_error == expected_error, f"Expected '{expected_error}', got '{actual_error}'"
-        
\ No newline at end of file
+        
+
+# =============================================================================
+
+    def test_trusted_save_maps_constraint_violations(self):
+        """
+        Test that a trusted save skips validation but reports a violated
+        unique constraint as a field error.
+        """
+        device1 = DeviceFactory(imei="123456789012345")
+        device2 = DeviceFactory.build(imei="123456789012345", owner=device1.owner, location=device1.location, department=device1.department)
+        with pytest.raises(ValidationError) as excinfo:
+            device2.save(validate=False)
+        assert excinfo.value.message_dict == {'imei': ["Device with this IMEI already exists."]}
+
+    def test_uniqueness_is_checked_in_one_query(self):
+        """
+        Test that clean() checks IMEI, serial number and barcode with a single query.
+        """
+        device1 = DeviceFactory(imei="123456789012345", serial_number="SN1", barcode="B1")
+        device2 = DeviceFactory.build(imei="123456789012345", serial_number="SN1", barcode="B1", owner=device1.owner)
+        with CaptureQueriesContext(connection) as queries:
+            with pytest.raises(ValidationError) as excinfo:
+                device2.clean()
+        assert set(excinfo.value.message_dict) == {'imei', 'serial_number', 'barcode'}
+        assert len(queries) == 1
+
+
+    def test_imei_reversed_follows_imei(self):
+        """
+        Test that the reversed IMEI is kept in step with the IMEI on save.
+        """
+        device = DeviceFactory(imei="123456789012345")
+        assert device.imei_reversed == "543210987654321"
+        device.imei = None
+        device.save()
+        device.refresh_from_db()
+        assert device.imei_reversed is None
+
+    def test_imei_reversed_follows_partial_and_bulk_updates(self):
+        """
+        Test that update_fields saves, update() and bulk_update() keep the
+        reversed IMEI in step.
+        """
+        device = DeviceFactory(imei="123456789012345")
+        device.imei = "111111111122222"
+        device.save(update_fields=['imei'])
+        device.refresh_from_db()
+        assert device.imei_reversed == "222221111111111"
+
+        Device.objects.filter(pk=device.pk).update(imei="333333333344444")
+        device.refresh_from_db()
+        assert device.imei_reversed == "444443333333333"
+
+        device.imei = "555555555566666"
+        Device.objects.bulk_update([device], ['imei'])
+        device.refresh_from_db()
+        assert device.imei_reversed == "666665555555555"
+
+        Device.objects.filter(pk=device.pk).update(imei=None)
+        device.refresh_from_db()
+        assert device.imei_reversed is None
+
+    def test_imei_ending_with(self):
+        """
+        Test that a suffix search matches on the last digits only.
+        """
+        device = DeviceFactory(imei="123456789012345")
+        DeviceFactory(imei="123456789054321")
+        DeviceFactory(imei="234500000000000")
+        assert list(Device.objects.imei_ending_with("2345")) == [device]
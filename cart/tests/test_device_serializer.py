@@ -1,6 +1,10 @@
 # tests/test_device_serializer.py
 
+from io import BytesIO
+
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
 from rest_framework.test import APIRequestFactory
 from cart.factories import (
     DeviceFactory,
@@ -64,4 +68,26 @@ class TestDeviceSerializer:
         actual_error = str(serializer.errors['imei'][0])
         expected_error = 'Device with this IMEI already exists.'
         assert actual_error == expected_error, f"Expected '{expected_error}', got '{actual_error}'"
-        
\ No newline at end of file
+        
+    def test_image_checks_match_the_model(self, monkeypatch):
+        """
+        Test that the serializer rejects the images Device.clean rejects,
+        with the same messages.
+        """
+        user = UserFactory()
+        request = APIRequestFactory().post('/devices/')
+        request.user = user
+
+        def upload(name, image_format):
+            buffer = BytesIO()
+            Image.new('RGB', (8, 8), 'red').save(buffer, format=image_format)
+            return SimpleUploadedFile(name, buffer.getvalue())
+
+        serializer = DeviceSerializer(data={'name': 'Phone', 'image': upload('phone.gif', 'GIF')}, context={'request': request})
+        assert not serializer.is_valid()
+        assert serializer.errors['image'] == ['Only .jpg, .jpeg, .tiff, .webp, and .png files are allowed.']
+
+        monkeypatch.setattr('cart.models.IMAGE_MAX_SIZE', 10)
+        serializer = DeviceSerializer(data={'name': 'Phone', 'image': upload('phone.png', 'PNG')}, context={'request': request})
+        assert not serializer.is_valid()
+        assert serializer.errors['image'] == ['The image file size cannot exceed 5 MB.']
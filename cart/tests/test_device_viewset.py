@@ -7,10 +7,12 @@ from cart.factories import (
     LocationFactory,
     DepartmentFactory
 )
-from cart.models import Device
+from cart.models import Device, DeviceQuerySet
 from rest_framework.test import APIClient
 from django.urls import reverse
 from rest_framework import status
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 @pytest.mark.django_db
 class TestDeviceViewSet:
@@ -37,7 +39,7 @@ class TestDeviceViewSet:
         DeviceFactory.create_batch(3, owner=self.user)
         response = self.client.get(self.url)
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 3
+        assert len(response.data['results']) == 3
 
     def test_create_device(self):
         """
@@ -82,4 +84,154 @@ class TestDeviceViewSet:
         assert response.status_code == status.HTTP_204_NO_CONTENT
         # Ensure the device is deleted
         assert not Device.objects.filter(id=device.id).exists()
-        
\ No newline at end of file
+        
+
+    def test_create_device_checks_uniqueness_once(self):
+        """
+        Test that creating a device runs a single uniqueness query and reports conflicts.
+        """
+        data = {
+            'name': 'New Device',
+            'location': self.location.id,
+            'department': self.department.id,
+            'imei': '123456789012345',
+            'serial_number': 'SN123456',
+            'barcode': 'DEV-1',
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        device_selects = [
+            query for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "cart_device"' in query['sql']
+        ]
+        assert len(device_selects) == 1
+
+        response = self.client.post(self.url, data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.data) == {'imei', 'serial_number', 'barcode'}
+
+    def test_sparse_fields(self):
+        """
+        Test that ?fields= leaves the text columns out of the query and the
+        response, and that the owner is joined rather than fetched per row.
+        """
+        DeviceFactory.create_batch(3, owner=self.user, notes='Long notes')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'name,device_model,repair_price,owner'})
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data['results'][0]) == {'id', 'name', 'device_model', 'repair_price', 'owner'}
+        assert response.data['results'][0]['owner'] == self.user.username
+        assert not any('"notes"' in query['sql'] for query in queries)
+        assert len(queries) == 1
+
+    def test_bulk_intake(self):
+        """
+        Test that a list of devices is inserted with a constant number of queries.
+        """
+        url = reverse('device-intake')
+        data = [
+            {'name': f'Phone {n}', 'imei': f'35000000000000{n}', 'serial_number': f'SN{n}',
+             'location': self.location.id, 'department': self.department.id}
+            for n in range(5)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [item['name'] for item in response.data] == [f'Phone {n}' for n in range(5)]
+        assert Device.objects.filter(owner=self.user).count() == 5
+        # Location, department and uniqueness checks, the INSERT, and the
+        # SAVEPOINT / RELEASE pair: the test transaction turns the atomic()
+        # around bulk_create into a savepoint.
+        assert len(queries) <= 6
+
+    def test_bulk_intake_reports_errors_per_row(self):
+        """
+        Test that existing and repeated values and unknown ids are reported
+        per row and that nothing is saved.
+        """
+        DeviceFactory(owner=self.user, imei='111111111111111')
+        url = reverse('device-intake')
+        data = [
+            {'name': 'Ok', 'imei': '222222222222222'},
+            {'name': 'Existing', 'imei': '111111111111111'},
+            {'name': 'Repeated', 'imei': '222222222222222'},
+            {'name': 'Bad location', 'location': 999999},
+        ]
+        response = self.client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data[0] == {}
+        assert 'imei' in response.data[1]
+        assert 'imei' in response.data[2]
+        assert 'location' in response.data[3]
+        assert Device.objects.filter(owner=self.user).count() == 1
+
+    def test_bulk_intake_stores_blank_identifiers_as_null(self):
+        """
+        Test that rows with blank barcodes, IMEIs and serial numbers do not
+        collide with each other.
+        """
+        data = [
+            {'name': f'Phone {n}', 'barcode': '', 'imei': '', 'serial_number': ''}
+            for n in range(2)
+        ]
+        response = self.client.post(reverse('device-intake'), data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        devices = Device.objects.filter(owner=self.user)
+        assert devices.count() == 2
+        assert set(devices.values_list('barcode', 'imei', 'serial_number')) == {(None, None, None)}
+
+
+    def test_bulk_intake_reports_concurrent_conflicts_per_row(self, monkeypatch):
+        """
+        Test that a unique violation raised by the insert is reported per row.
+        """
+        DeviceFactory(owner=self.user, imei='111111111111111')
+        check_unique_values = DeviceQuerySet.used_unique_values
+        calls = []
+
+        def racing_check(queryset, *args, **kwargs):
+            # The first check runs before the conflicting device "exists".
+            calls.append(args)
+            if len(calls) == 1:
+                return {'imei': set(), 'serial_number': set(), 'barcode': set()}
+            return check_unique_values(queryset, *args, **kwargs)
+
+        monkeypatch.setattr(DeviceQuerySet, 'used_unique_values', racing_check)
+        data = [{'name': 'Ok', 'imei': '222222222222222'}, {'name': 'Taken', 'imei': '111111111111111'}]
+        response = self.client.post(reverse('device-intake'), data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data[0] == {}
+        assert 'imei' in response.data[1]
+        assert Device.objects.filter(owner=self.user).count() == 1
+
+    def test_lookup_is_staff_only(self):
+        """
+        Test that regular users cannot use the device lookup.
+        """
+        response = self.client.get(reverse('device-lookup'), {'imei': '2345'})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_lookup_by_imei_suffix_and_serial(self):
+        """
+        Test that staff find any owner's devices by full IMEI, IMEI suffix
+        or serial number.
+        """
+        self.client.force_authenticate(user=UserFactory(is_staff=True))
+        device = DeviceFactory(imei='123456789012345', serial_number='SN-LOOKUP')
+        DeviceFactory(imei='999999999999999')
+        url = reverse('device-lookup')
+        for params in ({'imei': '123456789012345'}, {'imei': '012345'}, {'serial_number': 'SN-LOOKUP'}):
+            response = self.client.get(url, params)
+            assert response.status_code == status.HTTP_200_OK
+            assert [item['id'] for item in response.data] == [device.id]
+
+    def test_lookup_rejects_short_suffix(self):
+        """
+        Test that too-short or non-numeric IMEI searches are rejected.
+        """
+        self.client.force_authenticate(user=UserFactory(is_staff=True))
+        url = reverse('device-lookup')
+        assert self.client.get(url, {'imei': '45'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.client.get(url, {'imei': '12ab'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.client.get(url).status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,64 @@
+# =============================================================================
+# Tests for the Catalog Export
+# =============================================================================
+# tests/test_exports.py
+
+import csv
+import io
+import json
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cart.factories import DepartmentFactory, ProductFactory, UserFactory
+
+
+@pytest.mark.django_db
+class TestProductExport:
+    """
+    Test suite for the products export action.
+    """
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=UserFactory())
+        self.url = reverse('product-export')
+
+    def test_export_ndjson(self):
+        """
+        Test that NDJSON streams one object per product with joined names,
+        in a single query.
+        """
+        products = ProductFactory.create_batch(3, price='12.50')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+            body = b''.join(response.streaming_content).decode()
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        assert len([query for query in queries if 'cart_product' in query['sql']]) == 1
+
+        rows = [json.loads(line) for line in body.splitlines()]
+        assert [row['id'] for row in rows] == [product.id for product in products]
+        assert rows[0]['price'] == '12.50'
+        assert rows[0]['location_name'] == products[0].location.name
+        assert rows[0]['department_name'] == products[0].department.name
+
+    def test_export_csv_honours_filters(self):
+        """
+        Test that CSV has a header row and applies the product filters.
+        """
+        department = DepartmentFactory()
+        product = ProductFactory(department=department)
+        ProductFactory()
+
+        response = self.client.get(self.url, {'format': 'csv', 'department': department.id})
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Disposition'] == 'attachment; filename="products.csv"'
+
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        assert [int(row['id']) for row in rows] == [product.id]
+        assert rows[0]['department_name'] == department.name
@@ -0,0 +1,115 @@
+# =============================================================================
+# Tests for Image Derivatives
+# =============================================================================
+# tests/test_images.py
+
+from io import BytesIO
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cart.factories import DeviceFactory, ProductFactory, UserFactory
+from cart.images import derivative_name, generate_derivatives
+
+
+def make_upload(name='photo.jpg', size=(1600, 1200)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'blue').save(buffer, format='JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_DERIVATIVES_ASYNC = False
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestImageDerivatives:
+    """
+    Test suite for cart.images and the image_derivatives serializer field.
+    """
+
+    def test_upload_generates_derivatives_on_commit(self, media, django_capture_on_commit_callbacks):
+        """
+        Test that saving an image writes each size next to the original,
+        no larger than its bound.
+        """
+        with django_capture_on_commit_callbacks(execute=True):
+            product = ProductFactory(image=make_upload())
+        for size, pixels in (('thumbnail', 128), ('medium', 640)):
+            name = derivative_name(product.image.name, size)
+            assert name.startswith('products/')
+            with default_storage.open(name, 'rb') as derivative:
+                assert max(Image.open(derivative).size) == pixels
+
+    def test_unchanged_image_is_not_regenerated(self, media, django_capture_on_commit_callbacks):
+        """
+        Test that saves which keep the image do not schedule any work.
+        """
+        with django_capture_on_commit_callbacks(execute=True):
+            device = DeviceFactory(image=make_upload())
+        with django_capture_on_commit_callbacks() as callbacks:
+            device.notes = 'Cracked screen'
+            device.save()
+        assert callbacks == []
+
+    def test_derivative_names_keep_the_original_extension(self):
+        """
+        Test that images differing only by extension get distinct derivatives.
+        """
+        assert derivative_name('products/mug.jpg', 'thumbnail') != derivative_name('products/mug.png', 'thumbnail')
+        assert derivative_name('products/mug.jpg', 'thumbnail').startswith('products/mug.jpg.thumbnail.')
+
+    def test_replaced_or_cleared_image_drops_old_derivatives(self, media, django_capture_on_commit_callbacks):
+        """
+        Test that replacing an image deletes the old derivatives and writes
+        new ones, and that clearing it deletes them.
+        """
+        with django_capture_on_commit_callbacks(execute=True):
+            product = ProductFactory(image=make_upload('first.jpg'))
+        first = product.image.name
+        with django_capture_on_commit_callbacks(execute=True):
+            product.image = make_upload('second.jpg')
+            product.save()
+        second = product.image.name
+        assert not default_storage.exists(derivative_name(first, 'thumbnail'))
+        assert default_storage.exists(derivative_name(second, 'thumbnail'))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product.image = None
+            product.save()
+        assert not default_storage.exists(derivative_name(second, 'medium'))
+
+    def test_serializer_exposes_derivative_urls(self, media):
+        """
+        Test that the product representation links to each derivative.
+        """
+        product = ProductFactory(image=make_upload())
+        ProductFactory(image=None)
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        response = client.get(reverse('product-list'), {'ordering': 'name'})
+        assert response.status_code == status.HTTP_200_OK
+        derivatives = {item['id']: item['image_derivatives'] for item in response.data['results']}
+        assert set(derivatives[product.id]) == {'thumbnail', 'medium'}
+        assert derivatives[product.id]['thumbnail'].endswith(derivative_name(product.image.name, 'thumbnail'))
+        assert None in derivatives.values()
+
+    def test_backfill_command(self, media):
+        """
+        Test that the backfill command fills in missing derivatives only.
+        """
+        product = ProductFactory(image=make_upload())
+        device = DeviceFactory(owner=UserFactory(), image=make_upload('device.jpg'))
+        call_command('generate_image_derivatives')
+        for name in (product.image.name, device.image.name):
+            assert default_storage.exists(derivative_name(name, 'thumbnail'))
+        assert generate_derivatives(product.image.name) == []
@@ -0,0 +1,98 @@
+# =============================================================================
+# Tests for the Product Import
+# =============================================================================
+# tests/test_imports.py
+
+import io
+import json
+from decimal import Decimal
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cart.factories import CartItemWithProductFactory, DepartmentFactory, LocationFactory, ProductFactory, UserFactory
+from cart.imports import import_products, read_rows
+from cart.models import Cart, Product
+from cart.search import search_products
+
+
+@pytest.mark.django_db
+class TestProductImport:
+    """
+    Test suite for cart.imports.
+    """
+
+    def setup_method(self):
+        self.location = LocationFactory(name='Main Store')
+        self.department = DepartmentFactory(name='Accessories')
+
+    def test_csv_upsert_and_error_report(self):
+        """
+        Test that rows create or update by barcode and bad rows are reported.
+        """
+        existing = ProductFactory(barcode='100', name='Old Name', price=Decimal('5.00'))
+        csv_text = (
+            'barcode,name,price,location,department\n'
+            '100,New Name,6.00,,\n'
+            '200,Cable,3.50,Main Store,Accessories\n'
+            '300,Case,abc,Main Store,Accessories\n'
+            '400,Stand,9.00,Nowhere,Accessories\n'
+            '500,Charger,,,\n'
+            '200,Cable Again,3.50,Main Store,Accessories\n'
+        )
+        report = import_products(read_rows(io.StringIO(csv_text), 'csv'), batch_size=2)
+
+        assert (report.created, report.updated) == (1, 1)
+        assert {error['row']: set(error['errors']) for error in report.errors} == {
+            3: {'price'},
+            4: {'location'},
+            5: {'price', 'location', 'department'},
+            6: {'barcode'},
+        }
+        existing.refresh_from_db()
+        assert existing.name == 'New Name'
+        assert existing.price == Decimal('6.00')
+        created = Product.objects.get(barcode='200')
+        assert (created.location, created.department) == (self.location, self.department)
+        assert search_products('cable') == [created]
+
+    def test_update_rebuilds_cart_summaries(self):
+        """
+        Test that a price change made by an import reaches the stored cart totals.
+        """
+        item = CartItemWithProductFactory(quantity=2, product__barcode='100', product__price=Decimal('10.00'))
+        rows = read_rows(io.StringIO(json.dumps({'barcode': '100', 'price': '12.00'}) + '\n'), 'ndjson')
+        import_products(rows)
+
+        cart = Cart.objects.get(pk=item.cart_id)
+        assert cart.subtotal == Decimal('24.00')
+
+    def test_ndjson_endpoint(self):
+        """
+        Test the import action with an uploaded NDJSON file.
+        """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        body = '\n'.join([
+            json.dumps({'barcode': '700', 'name': 'Mount', 'price': '15.00',
+                        'location': 'Main Store', 'department': 'Accessories'}),
+            'not json',
+        ])
+        upload = SimpleUploadedFile('products.ndjson', body.encode(), content_type='application/x-ndjson')
+
+        response = client.post(reverse('product-import'), {'file': upload}, format='multipart')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 1
+        assert [error['row'] for error in response.data['errors']] == [2]
+
+    def test_command(self, tmp_path):
+        """
+        Test the import_products management command.
+        """
+        path = tmp_path / 'prices.csv'
+        path.write_text('barcode,name,price,location,department\n900,Dock,20.00,Main Store,Accessories\n')
+        call_command('import_products', str(path), batch_size=10)
+        assert Product.objects.get(barcode='900').price == Decimal('20.00')
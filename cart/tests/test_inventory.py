@@ -0,0 +1,89 @@
+# =============================================================================
+# Tests for Inventory Adjustments
+# =============================================================================
+# tests/test_inventory.py
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cart.factories import ProductFactory, UserFactory
+from cart.inventory import InsufficientStock, UnknownProducts, adjust_on_hand
+from cart.models import Product
+
+
+@pytest.mark.django_db
+class TestInventoryAdjustments:
+    """
+    Test suite for cart.inventory and the adjust_inventory action.
+    """
+
+    def test_adjust_on_hand_returns_new_quantities(self):
+        """
+        Test that deltas apply to the stored quantities, negatives allowed by default.
+        """
+        first = ProductFactory(on_hand=5)
+        second = ProductFactory(on_hand=1)
+        assert adjust_on_hand({first.id: 3, second.id: -4}) == {first.id: 8, second.id: -3}
+
+    def test_adjustment_invalidates_cached_carts(self):
+        """
+        Test that my_cart shows the adjusted stock instead of a cached payload.
+        """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        product = ProductFactory(on_hand=10)
+        client.post(reverse('cartitem-list'), {'product_id': product.id, 'quantity': 1}, format='json')
+        assert client.get(reverse('cart-my-cart'))['X-Cache'] == 'MISS'
+
+        adjust_on_hand({product.id: -4})
+        response = client.get(reverse('cart-my-cart'))
+        assert response['X-Cache'] == 'MISS'
+        assert response.data['items'][0]['product']['on_hand'] == 6
+
+    def test_guard_refuses_the_whole_batch(self):
+        """
+        Test that a guarded batch with one shortfall writes nothing and names only that product.
+        """
+        plenty = ProductFactory(on_hand=10)
+        short = ProductFactory(on_hand=1)
+
+        with pytest.raises(InsufficientStock) as exc:
+            adjust_on_hand({plenty.id: -8, short.id: -2}, allow_negative=False)
+        assert exc.value.product_ids == [short.id]
+        assert dict(Product.objects.values_list('pk', 'on_hand')) == {plenty.id: 10, short.id: 1}
+
+    def test_unknown_products(self):
+        """
+        Test that unknown ids are reported and nothing is written.
+        """
+        product = ProductFactory(on_hand=2)
+        with pytest.raises(UnknownProducts) as exc:
+            adjust_on_hand({product.id: 1, 999999: 1})
+        assert exc.value.product_ids == [999999]
+        product.refresh_from_db()
+        assert product.on_hand == 2
+
+    def test_adjust_inventory_endpoint(self):
+        """
+        Test the batch endpoint, including merged lines and the negative guard.
+        """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        url = reverse('product-adjust-inventory')
+        product = ProductFactory(on_hand=4)
+
+        response = client.post(url, {'adjustments': [
+            {'product_id': product.id, 'delta': -1},
+            {'product_id': product.id, 'delta': -1},
+        ]}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == [{'product_id': product.id, 'on_hand': 2}]
+
+        response = client.post(url, {
+            'adjustments': [{'product_id': product.id, 'delta': -3}],
+            'allow_negative': False,
+        }, format='json')
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data['product_ids'] == [product.id]
@@ -4,8 +4,10 @@
 import pytest
 from django.urls import reverse
 from rest_framework import status
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
-from cart.factories import LocationFactory
+from cart.factories import LocationFactory, UserFactory
 
 @pytest.mark.django_db
 class TestLocationViewSet:
@@ -46,3 +48,54 @@ class TestLocationViewSet:
         response = self.client.post(self.url, data, format='json')
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert 'name' in response.data
+
+    def test_list_is_cached_until_a_location_changes(self):
+        """
+        Test that repeated reads are served from the response cache without
+        queries, and that saving or deleting a location invalidates it.
+        """
+        self.client.force_authenticate(user=UserFactory())
+        location = LocationFactory(name='Front')
+        first = self.client.get(self.url)
+        assert first['X-Cache'] == 'MISS'
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url)
+        assert second['X-Cache'] == 'HIT'
+        assert second.content == first.content
+        assert not [query for query in queries if 'cart_location' in query['sql']]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        location.name = 'Back'
+        location.save()
+        response = self.client.get(self.url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.data[0]['name'] == 'Back'
+
+        location.delete()
+        response = self.client.get(self.url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.data == []
+
+    def test_cache_is_per_user_and_json_only(self):
+        """
+        Test that cached responses are never shared between users, that the
+        browsable API is not cached, and that Vary survives a hit.
+        """
+        LocationFactory()
+        self.client.force_authenticate(user=UserFactory())
+        first = self.client.get(self.url)
+        hit = self.client.get(self.url)
+        assert hit['X-Cache'] == 'HIT'
+        assert hit['Vary'] == first['Vary']
+
+        self.client.force_authenticate(user=UserFactory())
+        assert self.client.get(self.url)['X-Cache'] == 'MISS'
+
+        for _ in range(2):
+            response = self.client.get(self.url, HTTP_ACCEPT='text/html')
+            assert response.status_code == status.HTTP_200_OK
+            assert not response.has_header('X-Cache')
+
@@ -0,0 +1,58 @@
+# =============================================================================
+# Tests for the Order ViewSet
+# =============================================================================
+# tests/test_order_viewsets.py
+
+from datetime import timedelta
+from decimal import Decimal
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cart.factories import UserFactory
+from cart.models import Order
+
+
+@pytest.mark.django_db
+class TestOrderViewSet:
+    """
+    Test suite for the OrderViewSet.
+    """
+
+    def setup_method(self):
+        """
+        Initialize an authenticated APIClient and the list URL.
+        """
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('order-list')
+
+    def test_list_orders_is_paginated(self):
+        """
+        Test that the list only contains the user's orders, newest first.
+        """
+        first = Order.objects.create(user=self.user, total=Decimal('10.00'))
+        second = Order.objects.create(user=self.user, total=Decimal('20.00'))
+        Order.objects.create(user=UserFactory(), total=Decimal('30.00'))
+
+        response = self.client.get(self.url)
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.data['results']] == [second.id, first.id]
+        assert response.data['next'] is None
+
+    def test_filter_orders_by_status_and_date(self):
+        """
+        Test filtering orders by status and creation date range.
+        """
+        pending = Order.objects.create(user=self.user, total=Decimal('10.00'))
+        Order.objects.create(user=self.user, total=Decimal('20.00'), status='shipped')
+        old = Order.objects.create(user=self.user, total=Decimal('30.00'))
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = self.client.get(self.url, {'status': 'pending', 'created_after': since})
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.data['results']] == [pending.id]
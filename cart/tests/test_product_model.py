@@ -28,6 +28,25 @@ class TestProductModel:
         product = ProductFactory(name="Laptop", on_hand=10)
         product.update_inventory(20)
         assert product.on_hand == 20
+
+    def test_product_inventory_update_writes_only_on_hand(self):
+        """
+        Test that update_inventory does not overwrite other columns changed concurrently.
+        """
+        product = ProductFactory(name="Laptop", on_hand=10)
+        type(product).objects.filter(pk=product.pk).update(name="Renamed")
+        product.update_inventory(20)
+        product.refresh_from_db()
+        assert (product.name, product.on_hand) == ("Renamed", 20)
+
+    def test_product_adjust_inventory(self):
+        """
+        Test that adjust_inventory applies a delta to the stored quantity.
+        """
+        product = ProductFactory(on_hand=10)
+        stale = type(product).objects.get(pk=product.pk)
+        product.adjust_inventory(-3)
+        assert stale.adjust_inventory(-2) == 5
 # =============================================================================
 
     def test_product_clean(self):
@@ -3,10 +3,12 @@
 # =============================================================================
 
 import pytest
-from cart.factories import LocationFactory, DepartmentFactory, ProductFactory
+from cart.factories import LocationFactory, DepartmentFactory, ProductFactory, UserFactory
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from cart.factories import LocationFactory, DepartmentFactory, ProductFactory
 
 
@@ -30,7 +32,102 @@ class TestProductViewSet:
         ProductFactory.create_batch(2)
         response = self.client.get(self.url)
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 2
+        assert len(response.data['results']) == 2
+        assert response.data['next'] is None
+        assert 'count' not in response.data
+
+    def test_keyset_pagination_walks_every_product_once(self):
+        """
+        Test that following the next cursors visits every product exactly once,
+        newest first, and that the previous cursor returns the prior page.
+        """
+        self.client.force_authenticate(user=UserFactory())
+        products = ProductFactory.create_batch(5)
+        expected = [product.id for product in sorted(products, key=lambda p: (p.updated_at, p.id), reverse=True)]
+
+        pages = []
+        url = f'{self.url}?page_size=2'
+        while url:
+            response = self.client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            pages.append(response.data)
+            url = response.data['next']
+
+        assert [len(page['results']) for page in pages] == [2, 2, 1]
+        assert [item['id'] for page in pages for item in page['results']] == expected
+
+        response = self.client.get(pages[2]['previous'])
+        assert [item['id'] for item in response.data['results']] == expected[2:4]
+
+    def test_invalid_cursor(self):
+        """
+        Test that a malformed cursor returns 404.
+        """
+        self.client.force_authenticate(user=UserFactory())
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_filter_products(self):
+        """
+        Test filtering products by department, availability and price range.
+        """
+        self.client.force_authenticate(user=UserFactory())
+        department = DepartmentFactory()
+        match = ProductFactory(department=department, price='20.00', is_available=True)
+        ProductFactory(department=department, price='50.00', is_available=True)
+        ProductFactory(department=department, price='20.00', is_available=False)
+        ProductFactory(price='20.00', is_available=True)
+
+        response = self.client.get(self.url, {
+            'department': department.id,
+            'is_available': 'true',
+            'min_price': '10',
+            'max_price': '30',
+        })
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.data['results']] == [match.id]
+
+    def test_order_products_by_price(self):
+        """
+        Test that the ordering parameter is honoured across pages and that
+        fields outside ordering_fields are ignored.
+        """
+        self.client.force_authenticate(user=UserFactory())
+        for price in ('30.00', '10.00', '20.00'):
+            ProductFactory(price=price)
+
+        response = self.client.get(self.url, {'ordering': 'price', 'page_size': 2})
+        prices = [item['price'] for item in response.data['results']]
+        response = self.client.get(response.data['next'])
+        prices += [item['price'] for item in response.data['results']]
+        assert prices == ['10.00', '20.00', '30.00']
+
+        response = self.client.get(self.url, {'ordering': 'description'})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 3
+
+    def test_sparse_fields(self):
+        """
+        Test that ?fields= trims the representation and the loaded columns,
+        across pages, and that ?omit= drops the named fields.
+        """
+        self.client.force_authenticate(user=UserFactory())
+        for price in ('30.00', '10.00', '20.00'):
+            ProductFactory(price=price, description='Long text')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'name,price', 'ordering': 'price', 'page_size': 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data['results'][0]) == {'id', 'name', 'price'}
+        assert not any('"description"' in query['sql'] for query in queries)
+        response = self.client.get(response.data['next'])
+        assert [item['price'] for item in response.data['results']] == ['30.00']
+        assert set(response.data['results'][0]) == {'id', 'name', 'price'}
+
+        response = self.client.get(self.url, {'omit': 'description,image'})
+        assert 'description' not in response.data['results'][0]
+        assert 'image' not in response.data['results'][0]
+        assert 'name' in response.data['results'][0]
 
     def test_create_product(self):
         """
@@ -66,3 +163,42 @@ class TestProductViewSet:
         assert 'name' in response.data
         assert 'price' in response.data
 # ================================================================================================
+
+    def test_conditional_get(self):
+        """
+        Test that list and retrieve return 304 until a product changes.
+        """
+        self.client.force_authenticate(user=UserFactory())
+        product = ProductFactory()
+
+        response = self.client.get(self.url)
+        list_etag = response['ETag']
+        assert self.client.get(self.url, HTTP_IF_NONE_MATCH=list_etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        detail_url = reverse('product-detail', args=[product.id])
+        detail_etag = self.client.get(detail_url)['ETag']
+        assert self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        product.name = 'Renamed'
+        product.save()
+        assert self.client.get(self.url, HTTP_IF_NONE_MATCH=list_etag).status_code == status.HTTP_200_OK
+        assert self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code == status.HTTP_200_OK
+
+    def test_conditional_get_uses_the_fetched_page(self):
+        """
+        Test that list validators come from the page alone, without a COUNT,
+        and that a deletion on the page changes the ETag.
+        """
+        self.client.force_authenticate(user=UserFactory())
+        products = ProductFactory.create_batch(3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'page_size': 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(queries) == 1
+        assert not any('COUNT(' in query['sql'].upper() for query in queries)
+
+        etag = response['ETag']
+        assert self.client.get(self.url, {'page_size': 2}, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+        products[-1].delete()
+        assert self.client.get(self.url, {'page_size': 2}, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
@@ -0,0 +1,83 @@
+# =============================================================================
+# Tests for the Barcode Scan ViewSet
+# =============================================================================
+# tests/test_scan_viewset.py
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cart.factories import DeviceFactory, ProductFactory, UserFactory
+
+
+@pytest.mark.django_db
+class TestScanViewSet:
+    """
+    Test suite for the ScanViewSet.
+    """
+
+    def setup_method(self):
+        """
+        Initialize an authenticated APIClient.
+        """
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.client.force_authenticate(user=self.user)
+
+    def url(self, barcode):
+        return reverse('scan-detail', args=[barcode])
+
+    def test_scan_product_is_cached(self):
+        """
+        Test that a product resolves in one query and is then served from the LRU.
+        """
+        product = ProductFactory(barcode='0123456789012', price='19.99')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url('0123456789012'))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'type': 'product', 'id': product.id, 'name': product.name, 'price': '19.99'}
+        lookup_queries = [query for query in queries if 'barcode' in query['sql']]
+        assert len(lookup_queries) == 1
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url('0123456789012'))
+        assert not [query for query in queries if 'barcode' in query['sql']]
+
+    def test_scan_is_invalidated_on_save_and_delete(self):
+        """
+        Test that changing or deleting a product drops its cached barcode.
+        """
+        product = ProductFactory(barcode='111', price='5.00')
+        assert self.client.get(self.url('111')).data['price'] == '5.00'
+
+        product.price = '6.00'
+        product.save()
+        assert self.client.get(self.url('111')).data['price'] == '6.00'
+
+        product.barcode = '222'
+        product.save()
+        assert self.client.get(self.url('111')).status_code == status.HTTP_404_NOT_FOUND
+        assert self.client.get(self.url('222')).status_code == status.HTTP_200_OK
+
+        product.delete()
+        assert self.client.get(self.url('222')).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_scan_device_only_for_owner_or_staff(self):
+        """
+        Test that another user's device is not resolved for non-staff users.
+        """
+        own = DeviceFactory(owner=self.user, barcode='D-1')
+        DeviceFactory(barcode='D-2')
+
+        response = self.client.get(self.url('D-1'))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['type'] == 'device'
+        assert response.data['id'] == own.id
+        assert self.client.get(self.url('D-2')).status_code == status.HTTP_404_NOT_FOUND
+
+        self.client.force_authenticate(user=UserFactory(is_staff=True))
+        assert self.client.get(self.url('D-2')).status_code == status.HTTP_200_OK
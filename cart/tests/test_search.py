@@ -0,0 +1,95 @@
+# =============================================================================
+# Tests for Product Full-Text Search
+# =============================================================================
+# tests/test_search.py
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cart.factories import ProductFactory, UserFactory
+from cart.search import ContainsSearchBackend, SQLiteFTS5Backend, get_search_backend, search_products
+
+
+@pytest.mark.django_db
+class TestProductSearch:
+    """
+    Test suite for cart.search and the products search action.
+    """
+
+    def test_search_ranks_name_matches_first(self):
+        """
+        Test that prefix terms match and name matches outrank description matches.
+        """
+        in_description = ProductFactory(name='Charger', description='Works with every iPhone')
+        in_name = ProductFactory(name='iPhone Case', description='Clear')
+        ProductFactory(name='Cable', description='USB')
+
+        assert search_products('iph') == [in_name, in_description]
+
+    def test_index_follows_saves_and_deletes(self):
+        """
+        Test that renaming and deleting a product updates the index.
+        """
+        product = ProductFactory(name='Screen Protector', description='')
+        assert search_products('screen') == [product]
+
+        product.name = 'Tempered Glass'
+        product.save()
+        assert search_products('screen') == []
+        assert search_products('tempered') == [product]
+
+        product.delete()
+        assert search_products('tempered') == []
+
+    def test_match_expression_escapes_syntax(self):
+        """
+        Test that FTS5 operators in user input are treated as plain words.
+        """
+        assert SQLiteFTS5Backend.match_expression('case" OR NEAR(') == '"case"* "OR"* "NEAR"*'
+        assert SQLiteFTS5Backend.match_expression('  ') == ''
+
+    def test_backend_follows_database_vendor(self):
+        """
+        Test that the default backend is FTS5 on SQLite.
+        """
+        assert isinstance(get_search_backend(), SQLiteFTS5Backend)
+
+    def test_contains_backend(self):
+        """
+        Test that the fallback backend matches every word and ranks name matches first.
+        """
+        in_description = ProductFactory(name='Charger', description='Works with every iPhone case')
+        in_name = ProductFactory(name='iPhone Case', description='Clear')
+        ProductFactory(name='iPhone Cable', description='USB')
+
+        backend = ContainsSearchBackend()
+        assert backend.search('iphone case', 10) == [in_name.id, in_description.id]
+        assert backend.search('  ', 10) == []
+
+    def test_rebuild_command(self):
+        """
+        Test that the management command restores an emptied index.
+        """
+        product = ProductFactory(name='Headphones')
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM cart_product_fts')
+        assert search_products('headphones') == []
+
+        call_command('rebuild_product_search', batch_size=1)
+        assert search_products('headphones') == [product]
+
+    def test_search_endpoint(self):
+        """
+        Test that the search action returns serialized matches.
+        """
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        product = ProductFactory(name='Wireless Charger')
+
+        response = client.get(reverse('product-search'), {'q': 'wire'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.data] == [product.id]
@@ -0,0 +1,82 @@
+# =============================================================================
+# Tests for the Catalog Delta Sync
+# =============================================================================
+# tests/test_sync.py
+
+from datetime import timedelta
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cart.factories import DepartmentFactory, LocationFactory, ProductFactory, UserFactory
+from cart.models import Tombstone
+from cart.sync import encode_token
+
+
+@pytest.mark.django_db
+class TestCatalogSync:
+    """
+    Test suite for the SyncViewSet.
+    """
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=UserFactory())
+        self.url = reverse('sync-list')
+
+    def test_full_then_delta(self, settings):
+        """
+        Test that a token returns only rows changed since it, plus deletions.
+        """
+        settings.SYNC_OVERLAP = 0
+        kept, changed, deleted = ProductFactory.create_batch(3)
+
+        response = self.client.get(self.url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['full'] is True
+        assert {item['id'] for item in response.data['products']} == {kept.id, changed.id, deleted.id}
+        token = response.data['token']
+
+        changed.name = 'Changed'
+        changed.save()
+        deleted_id = deleted.id
+        deleted.delete()
+        department = DepartmentFactory()
+
+        response = self.client.get(self.url, {'since': token})
+        assert response.data['full'] is False
+        assert [item['id'] for item in response.data['products']] == [changed.id]
+        assert [item['id'] for item in response.data['departments']] == [department.id]
+        assert response.data['locations'] == []
+        assert response.data['deleted'] == {'locations': [], 'departments': [], 'products': [deleted_id]}
+
+    def test_cascaded_deletes_are_logged(self):
+        """
+        Test that products deleted with their location get tombstones too.
+        """
+        location = LocationFactory()
+        product = ProductFactory(location=location)
+        expected = {('location', location.id), ('product', product.id)}
+        location.delete()
+        assert set(Tombstone.objects.values_list('model', 'object_id')) == expected
+
+    def test_expired_token_forces_full_sync(self, settings):
+        """
+        Test that a token older than the tombstone retention returns everything.
+        """
+        settings.SYNC_TOMBSTONE_RETENTION_DAYS = 1
+        product = ProductFactory()
+        token = encode_token(timezone.now() - timedelta(days=2))
+
+        response = self.client.get(self.url, {'since': token})
+        assert response.data['full'] is True
+        assert [item['id'] for item in response.data['products']] == [product.id]
+
+    def test_invalid_token(self):
+        """
+        Test that a malformed token is rejected.
+        """
+        response = self.client.get(self.url, {'since': 'garbage'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
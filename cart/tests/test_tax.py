@@ -0,0 +1,90 @@
+# =============================================================================
+# Tests for the Tax Engine
+# =============================================================================
+# tests/test_tax.py
+
+from decimal import Decimal
+import pytest
+
+from cart.factories import (
+    CartFactory, CartItemWithProductFactory, DepartmentFactory, ProductFactory, UserFactory
+)
+from cart.models import Order, OrderItem
+from cart.serializers import CartSerializer, OrderSerializer
+from cart.tax import TaxLine, compute_tax, get_taxable_departments
+
+
+@pytest.mark.django_db
+class TestTaxEngine:
+    """
+    Test suite for cart.tax.
+    """
+
+    def test_compute_tax_per_line_and_total(self):
+        """
+        Test that only taxable departments are taxed and the cart tax is the sum of line taxes.
+        """
+        taxable = DepartmentFactory(is_taxable=True)
+        exempt = DepartmentFactory(is_taxable=False)
+        result = compute_tax([
+            TaxLine(3, Decimal('10.00'), taxable.id),
+            TaxLine(1, Decimal('20.00'), exempt.id),
+            TaxLine(1, Decimal('0.05'), taxable.id),
+            TaxLine(2, Decimal('5.00'), None),
+        ])
+
+        assert result.line_taxes == [Decimal('2.70'), Decimal('0.00'), Decimal('0.00'), Decimal('0.00')]
+        assert result.subtotal == Decimal('60.05')
+        assert result.tax == Decimal('2.70')
+        assert result.total == Decimal('62.75')
+
+    def test_taxable_map_is_cached_and_invalidated(self, django_assert_num_queries):
+        """
+        Test that the department map is cached and refreshed when a department is saved.
+        """
+        department = DepartmentFactory(is_taxable=True)
+        get_taxable_departments()
+        with django_assert_num_queries(0):
+            assert get_taxable_departments()[department.id] is True
+
+        department.is_taxable = False
+        department.save()
+        assert get_taxable_departments()[department.id] is False
+
+    def test_serializers_expose_tax(self):
+        """
+        Test that cart lines, carts and orders expose subtotal, tax and total.
+        """
+        user = UserFactory()
+        cart = CartFactory(user=user)
+        product = ProductFactory(price=Decimal('100.00'), department__is_taxable=True)
+        CartItemWithProductFactory(cart=cart, product=product, quantity=1)
+        cart.refresh_from_db()
+
+        data = CartSerializer(cart).data
+        assert data['items'][0]['tax'] == '9.00'
+        assert (data['subtotal'], data['tax'], data['total']) == ('100.00', '9.00', '109.00')
+
+        order = Order.objects.create(
+            user=user, subtotal=Decimal('100.00'), tax=Decimal('9.00'), total=Decimal('109.00')
+        )
+        OrderItem.objects.create(order=order, product=product, quantity=1, price=Decimal('100.00'))
+        data = OrderSerializer(order).data
+        assert (data['subtotal'], data['tax'], data['total']) == ('100.00', '9.00', '109.00')
+
+    def test_order_amounts_do_not_follow_department_changes(self):
+        """
+        Test that an order keeps the tax it was charged after its department
+        stops being taxable.
+        """
+        user = UserFactory()
+        product = ProductFactory(price=Decimal('100.00'), department__is_taxable=True)
+        order = Order.objects.create(
+            user=user, subtotal=Decimal('100.00'), tax=Decimal('9.00'), total=Decimal('109.00')
+        )
+        OrderItem.objects.create(order=order, product=product, quantity=1, price=Decimal('100.00'))
+
+        product.department.is_taxable = False
+        product.department.save()
+        data = OrderSerializer(order).data
+        assert (data['subtotal'], data['tax'], data['total']) == ('100.00', '9.00', '109.00')
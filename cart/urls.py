@@ -10,6 +10,8 @@ router.register(r'locations', views.LocationViewSet, basename='location')
 router.register(r'departments', views.DepartmentViewSet, basename='department')
 router.register(r'products', views.ProductViewSet, basename='product')
 router.register(r'devices', views.DeviceViewSet, basename='device')
+router.register(r'scan', views.ScanViewSet, basename='scan')
+router.register(r'sync', views.SyncViewSet, basename='sync')
 router.register(r'carts', views.CartViewSet, basename='cart')
 router.register(r'cart-items', views.CartItemViewSet, basename='cartitem')
 router.register(r'orders', views.OrderViewSet, basename='order')
@@ -0,0 +1,86 @@
+# utils.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, transaction
+
+from .models import Cart
+
+# =============================================================================
+# Per-request Cart Resolution
+# =============================================================================
+
+CART_ID_CACHE_KEY = 'cart:user:{user_id}:cart_id'
+
+
+def cart_id_cache_key(user_id):
+    return CART_ID_CACHE_KEY.format(user_id=user_id)
+
+
+def get_request_cart(request):
+    """
+    Returns the authenticated user's cart, creating it if needed.
+    The cart is resolved at most once per request; get_or_create does one
+    SELECT and falls back to an INSERT that recovers from the IntegrityError
+    raised when a concurrent request creates the cart first.
+    """
+    if getattr(request, '_cart', None) is None:
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        request._cart = cart
+        request._cart_id = cart.pk
+        cache.set(
+            cart_id_cache_key(request.user.pk),
+            cart.pk,
+            getattr(settings, 'CART_ID_CACHE_TIMEOUT', 300)
+        )
+    return request._cart
+
+
+def get_request_cart_id(request):
+    """
+    Returns the id of the authenticated user's cart.
+    The id is cached across requests, so paths that only filter or write by
+    ``cart_id`` do not need to load the cart at all. The cache entry expires
+    after CART_ID_CACHE_TIMEOUT: a deleted cart is only forgotten by the
+    process that deleted it, so writes go through ``with_request_cart_id``,
+    which recovers from a stale id.
+    """
+    if getattr(request, '_cart_id', None) is None:
+        cart_id = cache.get(cart_id_cache_key(request.user.pk))
+        if cart_id is None:
+            cart_id = get_request_cart(request).pk
+        request._cart_id = cart_id
+    return request._cart_id
+
+
+def forget_request_cart_id(request):
+    """
+    Drops the cached cart id, for this request and the following ones.
+    """
+    cache.delete(cart_id_cache_key(request.user.pk))
+    request._cart = None
+    request._cart_id = None
+
+
+def with_request_cart_id(request, write):
+    """
+    Calls ``write(cart_id)`` in a savepoint, for the user's cart. An id
+    read from the cache is checked first with one primary-key query: the
+    foreign key to a deleted cart is only enforced at commit, too late to
+    recover. If ``write`` still fails because the cart has just been deleted
+    (a foreign-key violation or a missing row), the id is re-resolved and
+    ``write`` is called once more. Any other failure is raised.
+    """
+    cart_id = get_request_cart_id(request)
+    if getattr(request, '_cart', None) is None and not Cart.objects.filter(pk=cart_id).exists():
+        forget_request_cart_id(request)
+        cart_id = get_request_cart_id(request)
+    try:
+        with transaction.atomic():
+            return write(cart_id)
+    except (IntegrityError, ObjectDoesNotExist):
+        if Cart.objects.filter(pk=cart_id).exists():
+            raise
+    forget_request_cart_id(request)
+    return write(get_request_cart_id(request))
@@ -1,10 +1,18 @@
 # views.py
 
+import io
+from collections import Counter
+
 from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.db.models import Max
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter
 
 from .models import (
     UserProfile, Location, Department, Product,
@@ -13,8 +21,26 @@ from .models import (
 from .serializers import (
     UserProfileSerializer, LocationSerializer, DepartmentSerializer,
     ProductSerializer, DeviceSerializer, CartSerializer, CartItemSerializer,
-    OrderSerializer, OrderItemSerializer
+    CartItemBulkSerializer, DeviceIntakeSerializer, InventoryAdjustmentSerializer, OrderSerializer,
+    OrderItemSerializer
+)
+from .autocomplete import get_index
+from .caching import get_cart_payload
+from .checkout import EmptyCart, checkout_cart
+from .exports import (
+    PRODUCT_EXPORT_FIELDS, CSVRenderer, NDJSONRenderer, csv_lines, ndjson_lines, product_export_rows
 )
+from .filters import DeviceFilter, OrderFilter, ProductFilter
+from .imports import IMPORT_FORMATS, import_products, read_rows
+from .inventory import InsufficientStock, UnknownProducts, adjust_on_hand
+from .mixins import (
+    ConditionalGetMixin, SparseFieldsetMixin, VersionedResponseCacheMixin, conditional_response
+)
+from .pagination import KeysetPagination
+from .scanning import resolve_barcode
+from .search import search_products
+from .sync import InvalidSyncToken, catalog_changes
+from .utils import get_request_cart, with_request_cart_id
 from django.contrib.auth.models import User
 
 # =============================================================================
@@ -81,37 +107,204 @@ class UserProfileViewSet(viewsets.ModelViewSet):
 # Location, Department, and Product ViewSets
 # =============================================================================
 
-class LocationViewSet(viewsets.ModelViewSet):
+class LocationViewSet(VersionedResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing locations.
+    List and retrieve support conditional GET (ETag / Last-Modified) and are
+    cached until a location changes.
     """
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+class DepartmentViewSet(VersionedResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing departments.
+    List and retrieve support conditional GET (ETag / Last-Modified) and are
+    cached until a department changes.
     """
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing products.
+    List and retrieve support conditional GET (ETag / Last-Modified).
+    The list is keyset-paginated on (updated_at, id) by default, and can be
+    filtered with ProductFilter and ordered by any indexed ``ordering_fields``.
+    ``?fields=`` / ``?omit=`` trim the representation and the columns loaded.
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = ProductFilter
+    ordering_fields = ['updated_at', 'price', 'name']
+    ordering = ('-updated_at', '-id')
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Full-text search over product names and descriptions, best match
+        first. Every word of ``q`` matches as a prefix.
+        """
+        query = request.query_params.get('q', '')
+        serializer = self.get_serializer(search_products(query), many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Type-ahead over product names, served from the in-process prefix
+        index without querying the database.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            limit = 10
+        matches = get_index().search(request.query_params.get('q', ''), max(limit, 1))
+        return Response([
+            {'id': product_id, 'name': name, 'price': f'{price:.2f}'}
+            for product_id, name, price in matches
+        ])
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Streams the (filtered) catalog as NDJSON or, with ``?format=csv``,
+        as CSV. Rows are read in chunks and never all held in memory.
+        """
+        rows = product_export_rows(
+            self.filter_queryset(self.get_queryset()),
+            getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+        )
+        renderer = request.accepted_renderer
+        if renderer.format == 'csv':
+            lines = csv_lines(rows, PRODUCT_EXPORT_FIELDS)
+        else:
+            lines = ndjson_lines(rows)
+        response = StreamingHttpResponse(lines, content_type=f'{renderer.media_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="products.{renderer.format}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', url_name='import')
+    def import_products(self, request):
+        """
+        Upserts products by barcode from an uploaded CSV or NDJSON ``file``.
+        The format comes from ``file_format`` or the file extension.
+        Returns the created/updated counts and a per-row error report.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('file_format') or upload.name.rsplit('.', 1)[-1].lower()
+        if file_format not in IMPORT_FORMATS:
+            return Response(
+                {'error': f"Unsupported format; use one of {', '.join(IMPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        upload.seek(0)
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = import_products(read_rows(lines, file_format))
+        return Response(report.as_dict())
+
+    @action(detail=False, methods=['post'])
+    def adjust_inventory(self, request):
+        """
+        Applies a batch of ``{"product_id", "delta"}`` adjustments to on_hand
+        in one UPDATE and returns the new quantities. With
+        ``allow_negative: false`` the whole batch is refused if any product
+        would go below zero.
+        """
+        serializer = InventoryAdjustmentSerializer(
+            data=request.data.get('adjustments'), many=True, allow_empty=False
+        )
+        serializer.is_valid(raise_exception=True)
+        deltas = Counter()
+        for adjustment in serializer.validated_data:
+            deltas[adjustment['product_id']] += adjustment['delta']
+        allow_negative = str(request.data.get('allow_negative', True)).lower() not in ('false', '0')
+        try:
+            on_hand = adjust_on_hand(deltas, allow_negative)
+        except UnknownProducts as exc:
+            return Response(
+                {'error': 'Unknown products', 'product_ids': exc.product_ids},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except InsufficientStock as exc:
+            return Response(
+                {'error': 'Insufficient stock', 'product_ids': exc.product_ids},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response([
+            {'product_id': product_id, 'on_hand': quantity}
+            for product_id, quantity in sorted(on_hand.items())
+        ])
+
+# =============================================================================
+# Barcode Scan ViewSet
+# =============================================================================
+
+class ScanViewSet(viewsets.ViewSet):
+    """
+    Resolves a scanned barcode to a product or device.
+    Devices are only resolved for their owner and for staff.
+    """
+    permission_classes = [IsAuthenticated]
+    lookup_field = 'barcode'
+    lookup_value_regex = '[^/]+'
+
+    def retrieve(self, request, barcode=None):
+        result = resolve_barcode(barcode)
+        if result is None or (
+            result.owner_id is not None
+            and result.owner_id != request.user.pk
+            and not request.user.is_staff
+        ):
+            raise NotFound('No product or device has this barcode.')
+        return Response({
+            'type': result.type,
+            'id': result.id,
+            'name': result.name,
+            'price': None if result.price is None else f'{result.price:.2f}',
+        })
+
+# =============================================================================
+# Catalog Sync ViewSet
+# =============================================================================
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Delta sync of locations, departments and products for POS clients.
+    ``GET /sync/`` returns the full catalog and a token; ``?since=<token>``
+    returns only what changed or was deleted since that token.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        try:
+            changes = catalog_changes(request.query_params.get('since'), {'request': request})
+        except InvalidSyncToken:
+            raise ValidationError({'since': 'Invalid sync token.'})
+        return Response(changes)
 
 # =============================================================================
 # Device ViewSet
 # =============================================================================
 
-class DeviceViewSet(viewsets.ModelViewSet):
+class DeviceViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing devices owned by users.
+    The list is keyset-paginated on (updated_at, id) by default, and can be
+    filtered with DeviceFilter and ordered by any indexed ``ordering_fields``.
+    ``?fields=`` / ``?omit=`` trim the representation and the columns loaded.
     """
     serializer_class = DeviceSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = DeviceFilter
+    ordering_fields = ['updated_at', 'created_at']
+    ordering = ('-updated_at', '-id')
 
     def get_queryset(self):
         """
@@ -125,6 +318,56 @@ class DeviceViewSet(viewsets.ModelViewSet):
         """
         serializer.save(owner=self.request.user)
 
+    @action(detail=False, methods=['post'])
+    def intake(self, request):
+        """
+        Registers a list of devices for the authenticated user in one
+        transaction. Errors are reported per row, aligned with the list,
+        and nothing is saved unless every row is valid.
+        """
+        serializer = DeviceIntakeSerializer(
+            data=request.data, many=True, allow_empty=False,
+            max_length=getattr(settings, 'DEVICE_INTAKE_MAX_ROWS', 500),
+            context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        devices = serializer.save(owner=request.user)
+        return Response(
+            DeviceSerializer(devices, many=True, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def lookup(self, request):
+        """
+        Staff-only lookup across every owner's devices, by exact
+        ``serial_number``, by full ``imei`` or by the last digits of one
+        (``imei`` with at least DEVICE_LOOKUP_MIN_DIGITS digits). Each form
+        is answered from its own index; the suffix search runs as a prefix
+        range on the stored reversed IMEI.
+        """
+        imei = request.query_params.get('imei', '').strip()
+        serial_number = request.query_params.get('serial_number', '').strip()
+        if not imei and not serial_number:
+            raise ValidationError({'detail': 'Provide imei or serial_number.'})
+        queryset = Device.objects.select_related('owner')
+        if serial_number:
+            queryset = queryset.filter(serial_number=serial_number)
+        if imei:
+            min_digits = getattr(settings, 'DEVICE_LOOKUP_MIN_DIGITS', 4)
+            if not imei.isdigit() or not min_digits <= len(imei) <= 15:
+                raise ValidationError({
+                    'imei': f'Enter between {min_digits} and 15 digits.'
+                })
+            if len(imei) == 15:
+                queryset = queryset.filter(imei=imei)
+            else:
+                queryset = queryset.imei_ending_with(imei)
+        limit = getattr(settings, 'DEVICE_LOOKUP_LIMIT', 50)
+        devices = queryset.order_by('imei_reversed', 'id')[:limit]
+        serializer = self.get_serializer(devices, many=True)
+        return Response(serializer.data)
+
 # =============================================================================
 # Cart and CartItem ViewSets
 # =============================================================================
@@ -140,17 +383,61 @@ class CartViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """
         Users can only see their own cart.
+        The items are eager-loaded, so reading a cart costs the same number of
+        queries however many lines it has.
         """
-        return Cart.objects.filter(user=self.request.user)
+        return Cart.objects.filter(user=self.request.user).with_items()
 
     @action(detail=False, methods=['get'])
     def my_cart(self, request):
         """
         Custom action to retrieve the authenticated user's cart.
+        Supports conditional GET: the validators come from the cart's
+        timestamp (touched by every cart mutation) and the newest product or
+        device in it, so an unchanged cart returns 304 without serializing.
+        Otherwise the serialized cart is served from the cart cache.
         """
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        serializer = self.get_serializer(cart)
-        return Response(serializer.data)
+        state = Cart.objects.filter(user=request.user).annotate(
+            product_updated_at=Max('items__product__updated_at'),
+            device_updated_at=Max('items__device__updated_at')
+        ).values_list('pk', 'updated_at', 'product_updated_at', 'device_updated_at').first()
+        if state is None:
+            serializer = self.get_serializer(get_request_cart(request))
+            return Response(serializer.data)
+        cart_id, *timestamps = state
+        last_modified = max(timestamp for timestamp in timestamps if timestamp is not None)
+
+        def build_response():
+            payload, hit = get_cart_payload(
+                cart_id,
+                request.get_host(),
+                lambda: self.get_serializer(self.get_queryset().get(pk=cart_id)).data
+            )
+            response = Response(payload)
+            response['X-Cache'] = 'HIT' if hit else 'MISS'
+            return response
+
+        return conditional_response(request, build_response, last_modified, cart_id)
+
+    @action(detail=False, methods=['post'], url_path='my_cart/checkout', url_name='checkout')
+    def checkout(self, request):
+        """
+        Converts the authenticated user's cart into an order and clears it.
+        """
+        try:
+            order = with_request_cart_id(request, checkout_cart)
+        except EmptyCart:
+            return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as exc:
+            return Response(
+                {'error': 'Insufficient stock', 'product_ids': exc.product_ids},
+                status=status.HTTP_409_CONFLICT
+            )
+        order = Order.objects.with_items().get(pk=order.pk)
+        return Response(
+            OrderSerializer(order, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
 
 class CartItemViewSet(viewsets.ModelViewSet):
     """
@@ -162,23 +449,42 @@ class CartItemViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """
         Retrieves cart items belonging to the authenticated user's cart.
+        Filtered through the cart's user rather than the cached cart id, so
+        a stale id can never hide the lines.
         """
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return CartItem.objects.filter(cart=cart)
+        return CartItem.objects.filter(cart__user=self.request.user).with_related()
 
     def perform_create(self, serializer):
         """
         Associates the cart item with the authenticated user's cart.
         """
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        serializer.save(cart=cart)
+        with_request_cart_id(self.request, lambda cart_id: serializer.save(cart_id=cart_id))
 
     def perform_update(self, serializer):
         """
         Ensures the cart item belongs to the authenticated user's cart when updating.
         """
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        serializer.save(cart=cart)
+        with_request_cart_id(self.request, lambda cart_id: serializer.save(cart_id=cart_id))
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Adds a list of lines to the authenticated user's cart in one
+        transaction and returns the refreshed cart.
+        """
+        serializer = CartItemBulkSerializer(data=request.data, many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+
+        def add_lines(cart_id):
+            serializer.save(cart_id=cart_id)
+            return cart_id
+
+        cart_id = with_request_cart_id(request, add_lines)
+        cart = Cart.objects.filter(pk=cart_id).with_items().get()
+        return Response(
+            CartSerializer(cart, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
 
 # =============================================================================
 # Order and OrderItem ViewSets
@@ -187,16 +493,24 @@ class CartItemViewSet(viewsets.ModelViewSet):
 class OrderViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing orders.
+    The list is keyset-paginated on (created_at, id) and can be filtered
+    with OrderFilter.
     """
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = OrderFilter
+    ordering_fields = ['created_at']
+    ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         """
         Users can only see their own orders.
+        Items are eager-loaded for the nested items.
         """
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.filter(user=self.request.user).with_items()
 
     def perform_create(self, serializer):
         """
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'cart',
     'rest_framework',
+    'django_filters',
     'debug_toolbar',  # Add this line
     'drf_spectacular',  # Add this line
     'corsheaders',
@@ -133,6 +134,41 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # Directory to store uploaded medi
 
 TAX_RATE = Decimal('0.09')  # 9% tax rate
 
+# Caches
+# Local memory by default; point 'default' at Redis/Memcached in production
+# so invalidation is shared between worker processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'enigma-api',
+    }
+}
+
+CART_CACHE_ALIAS = 'default'  # cache holding serialized carts
+CART_CACHE_TIMEOUT = 300  # seconds
+CART_ID_CACHE_TIMEOUT = 300  # seconds a user's cart id is cached across requests
+RESPONSE_CACHE_ALIAS = 'default'  # cache holding rendered Location/Department responses
+RESPONSE_CACHE_TIMEOUT = 3600  # seconds
+SCAN_CACHE_SIZE = 10000  # barcodes held in each process's scan LRU
+SCAN_CACHE_TIMEOUT = 60  # seconds before another process's change is seen
+PRODUCT_SEARCH_BACKEND = None  # None picks one for the database vendor (see cart.search)
+PRODUCT_SEARCH_LIMIT = 25  # results returned by /products/search/
+AUTOCOMPLETE_MEMORY_BUDGET = 32 * 1024 * 1024  # bytes per process for the name index
+AUTOCOMPLETE_MAX_AGE = 600  # seconds before a process rebuilds its name index
+EXPORT_CHUNK_SIZE = 2000  # rows fetched per round trip by catalog exports
+IMPORT_BATCH_SIZE = 500  # rows upserted per transaction by product imports
+DEVICE_INTAKE_MAX_ROWS = 500  # devices accepted by one bulk intake request
+DEVICE_LOOKUP_MIN_DIGITS = 4  # shortest IMEI suffix accepted by the staff device lookup
+DEVICE_LOOKUP_LIMIT = 50  # devices returned by one staff device lookup
+IMAGE_DERIVATIVE_SIZES = {'thumbnail': 128, 'medium': 640}  # longest side in pixels
+IMAGE_DERIVATIVE_FORMAT = 'WEBP'  # falls back to JPEG without Pillow WebP support
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVE_WORKERS = 2  # threads generating derivatives after uploads
+IMAGE_DERIVATIVES_ASYNC = True  # False generates them inline, on commit
+SYNC_OVERLAP = 5  # seconds re-read before each sync token, for late commits
+SYNC_TOMBSTONE_RETENTION_DAYS = 30  # older sync tokens get a full resync
+
 # DRF settings
 # settings.py
 